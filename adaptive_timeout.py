@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Adaptive Upstream Timeouts
+Keeps a rolling latency histogram per upstream endpoint and derives each
+call's timeout from it: clamp(p99 x factor, floor, ceiling)
+
+- Until an endpoint has min_samples observations its fixed default is used
+- A call that times out is recorded at its timeout, so a slow endpoint's
+  p99 climbs and its timeout relaxes towards the ceiling
+"""
+
+from bisect import bisect_left
+from collections import deque
+import os
+import threading
+import time
+
+import requests
+
+from deadline import call_timeout
+
+# Geometric bucket bounds from 50ms to ~60s
+BUCKET_BOUNDS = [round(0.05 * 1.25 ** i, 3) for i in range(33)]
+
+class LatencyHistogram:
+    def __init__(self, window=200):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._samples = deque()
+        self.window = window
+
+    def observe(self, latency):
+        bucket = bisect_left(BUCKET_BOUNDS, latency)
+        self.counts[bucket] += 1
+        self._samples.append(bucket)
+        if len(self._samples) > self.window:
+            self.counts[self._samples.popleft()] -= 1
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self._samples:
+            return None
+        target = fraction * len(self._samples)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                break
+        return BUCKET_BOUNDS[min(bucket, len(BUCKET_BOUNDS) - 1)]
+
+class AdaptiveTimeouts:
+    def __init__(self, factor=2.0, floor=2.0, ceiling=30.0, min_samples=5, window=200):
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.window = window
+
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, endpoint, default):
+        """Timeout for the next call to endpoint"""
+        with self._lock:
+            return self._timeout(self._histograms.get(endpoint), default)
+
+    def _timeout(self, histogram, default):
+        if histogram is None or len(histogram) < self.min_samples:
+            return default
+        return min(self.ceiling, max(self.floor, histogram.percentile(0.99) * self.factor))
+
+    def observe(self, endpoint, latency):
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram(self.window)
+            histogram.observe(latency)
+
+    def get(self, session, endpoint, url, default, deadline=None, **kwargs):
+        """
+        session.get() with an adaptive timeout, recording how long it took
+        The timeout is also capped by the optional request deadline
+        """
+        adaptive = self.timeout(endpoint, default)
+        timeout = call_timeout(deadline, adaptive)
+        start = time.monotonic()
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except requests.Timeout:
+            # Only a full-length timeout says something about the endpoint
+            if timeout >= adaptive:
+                self.observe(endpoint, timeout)
+            raise
+        self.observe(endpoint, time.monotonic() - start)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'samples': len(histogram),
+                    'p50': histogram.percentile(0.50),
+                    'p99': histogram.percentile(0.99),
+                    'timeout': self._timeout(histogram, None)
+                }
+                for endpoint, histogram in self._histograms.items()
+            }
+
+# Shared by every client that calls the same upstream endpoints
+upstream_timeouts = AdaptiveTimeouts(
+    factor=float(os.getenv('ADAPTIVE_TIMEOUT_FACTOR', 2.0)),
+    floor=float(os.getenv('ADAPTIVE_TIMEOUT_FLOOR', 2.0)),
+    ceiling=float(os.getenv('ADAPTIVE_TIMEOUT_CEILING', 30.0))
+)
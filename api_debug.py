@@ -4,6 +4,7 @@ Debug Gracenote API key and endpoints
 """
 
 import requests
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_DIAGNOSTIC
 import os
 
 def debug_gracenote_api():
@@ -37,6 +38,12 @@ def debug_gracenote_api():
         params.update(extra_params)
         print(f"Params: {params}")
         
+        try:
+            gracenote_budget.acquire(PRIORITY_DIAGNOSTIC)
+        except QuotaExhausted as e:
+            print(f"⏸️ {e} - stopping diagnostics")
+            break
+        
         try:
             response = requests.get(url, params=params, timeout=10)
             print(f"Status: {response.status_code}")
@@ -4,6 +4,7 @@ Test what Gracenote API endpoints your key can access
 """
 
 import requests
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_DIAGNOSTIC
 
 def test_api_permissions():
     api_key = 'uk2dqjggp2qr9vzgce4a8dq7'
@@ -40,6 +41,12 @@ def test_api_permissions():
         test_params = {'api_key': api_key}
         test_params.update(params)
         
+        try:
+            gracenote_budget.acquire(PRIORITY_DIAGNOSTIC)
+        except QuotaExhausted as e:
+            print(f"  ⏸️ {e} - stopping diagnostics")
+            break
+        
         try:
             response = requests.get(url, params=test_params, timeout=8)
             print(f"  Status: {response.status_code}")
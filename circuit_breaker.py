@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Circuit Breakers for Schedule Sources
+Tracks rolling success and latency per source and network and stops
+calling a source that keeps failing for that network
+
+- Only transport errors, 5xx responses and upstream timeouts count as failures
+- A source that keeps answering without any programs is skipped too, after
+  its own (higher) run of empty answers
+
+- closed: calls go through
+- open: calls are skipped until reset_timeout has passed
+- half_open: one probe call decides whether to close or reopen
+"""
+
+from collections import deque
+import os
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_timeout=300, window=50, empty_threshold=5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.empty_threshold = empty_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.consecutive_empty = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+        # Rolling (ok, latency_seconds) samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call to this source should be made now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self.probe_started_at = now
+                return True
+
+            # Half-open: one probe at a time; a probe that never reported
+            # back (cancelled before it ran) expires after reset_timeout
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def record(self, ok, latency, empty=False):
+        """
+        Report the outcome of a call that allow() let through
+        empty marks an answer that came back without any programs
+        """
+        with self._lock:
+            self._samples.append((ok and not empty, latency))
+            self.probe_started_at = None
+
+            if ok and not empty:
+                self.consecutive_failures = 0
+                self.consecutive_empty = 0
+                if self.state != CLOSED:
+                    print(f"🟢 Circuit for {self.name} closed")
+                self.state = CLOSED
+                return
+
+            if ok:
+                self.consecutive_failures = 0
+                self.consecutive_empty += 1
+                if self.state == HALF_OPEN or self.consecutive_empty >= self.empty_threshold:
+                    self._open(f"{self.consecutive_empty} empty answers")
+                return
+
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open(f"{self.consecutive_failures} failures")
+
+    def _open(self, reason):
+        # Caller holds self._lock
+        if self.state != OPEN:
+            print(f"🔴 Circuit for {self.name} opened after {reason}")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def release(self):
+        """
+        Report a call that says nothing about the source (our own budget or quota ran out)
+        Frees a half-open probe slot without changing the state
+        """
+        with self._lock:
+            self.probe_started_at = None
+
+    def is_healthy(self):
+        with self._lock:
+            return self.state == CLOSED and self.consecutive_failures == 0 and self.consecutive_empty == 0
+
+    def stats(self):
+        with self._lock:
+            samples = list(self._samples)
+            state = self.state
+            failures = self.consecutive_failures
+            empty = self.consecutive_empty
+            retry_in = None
+            if state == OPEN:
+                retry_in = max(0, round(self.reset_timeout - (time.monotonic() - self.opened_at)))
+
+        latencies = sorted(latency for _, latency in samples)
+        successes = sum(1 for ok, _ in samples if ok)
+        return {
+            'state': state,
+            'consecutive_failures': failures,
+            'consecutive_empty': empty,
+            'samples': len(samples),
+            'success_rate': round(successes / len(samples), 3) if samples else None,
+            'latency_p50': round(_percentile(latencies, 0.50), 3) if latencies else None,
+            'latency_p95': round(_percentile(latencies, 0.95), 3) if latencies else None,
+            'retry_in': retry_in
+        }
+
+class BreakerRegistry:
+    def __init__(self, failure_threshold=3, reset_timeout=300, empty_threshold=5):
+        self.failure_threshold = failure_threshold
+        self.empty_threshold = empty_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, network=None):
+        """Breaker for a source, separate per network so one network's gaps do not block the others"""
+        key = f"{name}/{network.upper()}" if network else name
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(
+                    key, self.failure_threshold, self.reset_timeout, empty_threshold=self.empty_threshold)
+            return breaker
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+# Shared by every schedule source chain in the process
+source_breakers = BreakerRegistry(
+    failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3)),
+    reset_timeout=int(os.getenv('CIRCUIT_RESET_TIMEOUT', 300)),
+    empty_threshold=int(os.getenv('CIRCUIT_EMPTY_THRESHOLD', 5))
+)
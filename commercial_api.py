@@ -11,14 +11,19 @@ import requests
 from datetime import datetime, timedelta
 import json
 import os
+from hedged_race import hedge_settings, race_sources, run_source, source_error
+from deadline import call_timeout, deadline_result
+from gracenote_quota import gracenote_budget, PRIORITY_USER
+from http_transport import transport
 
 class CommercialTVAPI:
-    def __init__(self, gracenote_api_key=None, rovi_api_key=None):
+    def __init__(self, gracenote_api_key=None, rovi_api_key=None, hedged=None):
         self.gracenote_key = gracenote_api_key or os.getenv('GRACENOTE_API_KEY')
         self.rovi_key = rovi_api_key or os.getenv('ROVI_API_KEY')
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.hedged, self.hedge_delay = hedge_settings(hedged)
+        
+        self.session = transport.client({
             'User-Agent': 'TVScheduleViewer/1.0 Commercial',
             'Accept': 'application/json'
         })
@@ -31,7 +36,7 @@ class CommercialTVAPI:
             'fox': '20363'   # FOX National
         }
     
-    def get_gracenote_schedule(self, network, date_str):
+    def get_gracenote_schedule(self, network, date_str, deadline=None):
         """
         Gracenote TMS API - The industry standard
         Used by cable companies, streaming services, and TV guides
@@ -61,7 +66,9 @@ class CommercialTVAPI:
                 'api_key': self.gracenote_key
             }
             
-            response = self.session.get(url, params=params, timeout=15)
+            # Raises QuotaExhausted / DeadlineExceeded, reported through source_error below
+            gracenote_budget.acquire(PRIORITY_USER, deadline=deadline)
+            response = self.session.get(url, params=params, timeout=call_timeout(deadline, 15))
             response.raise_for_status()
             
             data = response.json()
@@ -100,11 +107,11 @@ class CommercialTVAPI:
             }
             
         except requests.RequestException as e:
-            return {"error": f"Gracenote API request failed: {str(e)}"}
+            return source_error(f"Gracenote API request failed: {str(e)}", e)
         except Exception as e:
-            return {"error": f"Gracenote API error: {str(e)}"}
+            return source_error(f"Gracenote API error: {str(e)}", e)
     
-    def get_rovi_schedule(self, network, date_str):
+    def get_rovi_schedule(self, network, date_str, deadline=None):
         """
         Rovi API - Alternative commercial provider
         """
@@ -128,7 +135,7 @@ class CommercialTVAPI:
                 'date': date_str
             }
             
-            response = self.session.get(url, params=params, timeout=15)
+            response = self.session.get(url, params=params, timeout=call_timeout(deadline, 15))
             response.raise_for_status()
             
             data = response.json()
@@ -146,9 +153,9 @@ class CommercialTVAPI:
             }
             
         except Exception as e:
-            return {"error": f"Rovi API error: {str(e)}"}
+            return source_error(f"Rovi API error: {str(e)}", e)
     
-    def get_schedule_direct(self, network, date_str):
+    def get_schedule_direct(self, network, date_str, deadline=None):
         """
         Schedule Direct - Non-commercial but high quality
         """
@@ -165,7 +172,7 @@ class CommercialTVAPI:
             }
             
         except Exception as e:
-            return {"error": f"Schedule Direct error: {str(e)}"}
+            return source_error(f"Schedule Direct error: {str(e)}", e)
     
     def _generate_rovi_signature(self):
         """Generate required signature for Rovi API"""
@@ -182,16 +189,35 @@ class CommercialTVAPI:
         }
         return mso_ids.get(network.lower(), '')
     
-    def get_commercial_grade_schedule(self, network, date_str):
+    def get_commercial_grade_schedule(self, network, date_str, deadline=None):
         """
         Get schedule using commercial-grade APIs
+        deadline bounds the whole lookup across every provider
         """
         print(f"\n🏢 COMMERCIAL-GRADE SCHEDULE LOOKUP: {network.upper()}")
         print("=" * 60)
         print("Using the EXACT same APIs as cable companies and streaming services")
         
+        if self.hedged:
+            sources = [
+                ("Gracenote", lambda: self.get_gracenote_schedule(network, date_str, deadline)),
+                ("Rovi", lambda: self.get_rovi_schedule(network, date_str, deadline)),
+                ("Schedule Direct", lambda: self.get_schedule_direct(network, date_str, deadline))
+            ]
+            winner, result, outcomes = race_sources(sources, hedge_delay=self.hedge_delay, deadline=deadline, network=network)
+            if result is not None:
+                print(f"✅ SUCCESS: {winner} returned {len(result['schedule'])} programs")
+                return result
+            for name, outcome in outcomes.items():
+                print(f"❌ {name} failed: {outcome.get('error', 'No data')}")
+            if deadline is not None and deadline.expired():
+                return deadline_result(network, date_str, deadline, sources='Commercial APIs')
+            return self._no_commercial_data(network, date_str)
+        
         # Try Gracenote TMS first (industry standard)
-        result = self.get_gracenote_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, sources='Commercial APIs')
+        result = run_source("Gracenote", lambda: self.get_gracenote_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ SUCCESS: Gracenote returned {len(result['schedule'])} programs")
             return result
@@ -199,7 +225,9 @@ class CommercialTVAPI:
             print(f"❌ Gracenote failed: {result.get('error', 'No data')}")
         
         # Try Rovi as backup
-        result = self.get_rovi_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, sources='Commercial APIs')
+        result = run_source("Rovi", lambda: self.get_rovi_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ SUCCESS: Rovi returned {len(result['schedule'])} programs")
             return result
@@ -207,13 +235,18 @@ class CommercialTVAPI:
             print(f"❌ Rovi failed: {result.get('error', 'No data')}")
         
         # Try Schedule Direct for non-commercial
-        result = self.get_schedule_direct(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, sources='Commercial APIs')
+        result = run_source("Schedule Direct", lambda: self.get_schedule_direct(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ SUCCESS: Schedule Direct returned {len(result['schedule'])} programs")
             return result
         else:
             print(f"❌ Schedule Direct failed: {result.get('error', 'No data')}")
         
+        return self._no_commercial_data(network, date_str)
+    
+    def _no_commercial_data(self, network, date_str):
         return {
             "error": "All commercial APIs require valid keys",
             "network": network.upper(),
@@ -6,20 +6,61 @@ Uses multiple reliable FREE APIs for guaranteed schedule accuracy
 - TV-API.com (backup) - Free tier available
 """
 
-import requests
 from datetime import datetime, timedelta
 import json
+import os
 import time
+from single_flight import SingleFlight, request_key
+from snapshot_store import SnapshotStore
+from response_cache import TTLCache
+from hedged_race import hedge_settings, race_sources, run_source, source_error
+from deadline import call_timeout, deadline_result
+from http_transport import transport
+from tvmaze_stream import iter_network_airings, tvmaze_program
+from tvmaze_bulk import TvmazeBulkStore, sync_full_schedule
+
+# TVmaze network names for major US networks
+TVMAZE_NETWORKS = {
+    'nbc': 'NBC',
+    'abc': 'ABC',
+    'cbs': 'CBS',
+    'fox': 'FOX'
+}
 
 class ComprehensiveTVAPI:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, store=None, hedged=None):
+        self.session = transport.client({
             'User-Agent': 'Mozilla/5.0 (compatible; TVScheduleViewer/1.0)',
             'Accept': 'application/json'
         })
+        
+        # Concurrent requests for the same upstream URL share one call
+        self.inflight = SingleFlight()
+        
+        self.hedged, self.hedge_delay = hedge_settings(hedged)
+        
+        # Parsed TVmaze country schedules, one per (country, date)
+        self.tvmaze_days = TTLCache(ttl=int(os.getenv('TVMAZE_DAY_TTL', 1800)), max_entries=32)
+        
+        # Verified schedules survive restarts, so a new process starts warm
+        self.store = store or SnapshotStore()
+        self.snapshot_max_age = int(os.getenv('SNAPSHOT_MAX_AGE', 6 * 3600))
+        
+        # Every future airing from TVmaze's full schedule, synced periodically, in the same file
+        self.tvmaze_bulk = TvmazeBulkStore(self.store.path)
+        
+        # Without a bulk sync, days further out than this are not expected to have listings yet
+        self.horizon_days = int(os.getenv('SCHEDULE_HORIZON_DAYS', 14))
     
-    def get_tvmaze_schedule(self, network, date_str):
+    def _get(self, url, params=None, timeout=15):
+        """
+        GET through the session, coalescing identical in-flight requests
+        Waiters receive the same response object, or the same exception
+        """
+        key = request_key('GET', url, params)
+        return self.inflight.do(key, self.session.get, url, params=params, timeout=timeout)
+    
+    def get_tvmaze_schedule(self, network, date_str, deadline=None):
         """
         TVmaze API - Free unlimited requests
         Get schedule for specific date and network
@@ -27,52 +68,12 @@ class ComprehensiveTVAPI:
         try:
             print(f"Fetching {network.upper()} schedule from TVmaze API...")
             
-            # TVmaze network IDs for major US networks
-            network_ids = {
-                'nbc': 'NBC',
-                'abc': 'ABC', 
-                'cbs': 'CBS',
-                'fox': 'FOX'
-            }
-            
-            network_name = network_ids.get(network.lower())
+            network_name = TVMAZE_NETWORKS.get(network.lower())
             if not network_name:
                 return {"error": f"Network {network} not supported"}
             
-            # Get schedule for specific date
-            url = f"https://api.tvmaze.com/schedule"
-            params = {
-                'country': 'US',
-                'date': date_str
-            }
-            
-            response = self.session.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            
-            all_shows = response.json()
-            network_shows = []
-            
-            # Filter for specific network
-            for show in all_shows:
-                if (show.get('show', {}).get('network', {}) and 
-                    show['show']['network'].get('name') == network_name):
-                    
-                    airtime = show.get('airtime', '')
-                    show_name = show.get('show', {}).get('name', 'Unknown Show')
-                    summary = show.get('show', {}).get('summary', 'No description available')
-                    
-                    # Clean HTML from summary
-                    if summary:
-                        summary = summary.replace('<p>', '').replace('</p>', '').replace('<b>', '').replace('</b>', '')
-                    
-                    network_shows.append({
-                        "time": airtime,
-                        "title": show_name,
-                        "description": summary[:200] + "..." if len(summary) > 200 else summary
-                    })
-            
-            # Sort by time
-            network_shows.sort(key=lambda x: x['time'])
+            # One shared download per date serves every network
+            network_shows = self.get_tvmaze_day(date_str, deadline=deadline).get(network_name, [])
             
             return {
                 "network": network.upper(),
@@ -80,14 +81,75 @@ class ComprehensiveTVAPI:
                 "source": "TVmaze API (Free)",
                 "status": "verified",
                 "total_programs": len(network_shows),
-                "schedule": network_shows
+                "schedule": list(network_shows)
             }
             
         except Exception as e:
             print(f"TVmaze API failed for {network}: {e}")
-            return {"error": f"TVmaze API failed: {str(e)}"}
+            return source_error(f"TVmaze API failed: {str(e)}", e)
+    
+    def get_tvmaze_day(self, date_str, country='US', deadline=None):
+        """
+        Airings TVmaze lists for a date on the supported networks, indexed by network name
+        The country schedule is streamed and parsed once per (country, date)
+        and shared by all network lookups
+        """
+        key = (country, date_str)
+        index = self.tvmaze_days.get(key)
+        if index is not None:
+            return index
+        
+        # Dates covered by the last bulk sync are answered from disk
+        index = self.tvmaze_bulk.get_day(date_str, TVMAZE_NETWORKS.values(), country)
+        if index is not None:
+            self.tvmaze_days.set(key, index)
+            return index
+        return self.inflight.do(('tvmaze-day',) + key, self._fetch_tvmaze_day, country, date_str, deadline)
     
-    def get_tv_api_schedule(self, network, date_str):
+    def _fetch_tvmaze_day(self, country, date_str, deadline=None):
+        url = "https://api.tvmaze.com/schedule"
+        params = {
+            'country': country,
+            'date': date_str
+        }
+        
+        index = {}
+        # Stream the day's payload and only decode airings on our networks
+        with self.session.get(url, params=params, timeout=call_timeout(deadline, 15), stream=True) as response:
+            response.raise_for_status()
+            
+            for network_name, airing, show in iter_network_airings(response, TVMAZE_NETWORKS.values()):
+                index.setdefault(network_name, []).append(tvmaze_program(airing, show))
+        
+        # Sort by time
+        for programs in index.values():
+            programs.sort(key=lambda x: x['time'])
+        
+        print(f"TVmaze {country} schedule for {date_str}: {sum(map(len, index.values()))} airings on {len(index)} networks")
+        self.tvmaze_days.set((country, date_str), index)
+        return index
+    
+    def schedule_horizon(self, country='US'):
+        """Last date (YYYY-MM-DD) the sources are expected to have listings for"""
+        coverage = self.tvmaze_bulk.coverage(country)
+        if coverage is not None:
+            return coverage['last_date']
+        return (datetime.now() + timedelta(days=self.horizon_days)).strftime('%Y-%m-%d')
+    
+    def tvmaze_bulk_age(self, country='US'):
+        """Seconds since the last TVmaze bulk sync, or None if there is no usable copy"""
+        coverage = self.tvmaze_bulk.coverage(country)
+        return None if coverage is None else coverage['age']
+    
+    def sync_tvmaze_bulk(self, country='US'):
+        """Replace the local copy of TVmaze's full schedule with a fresh download"""
+        result = sync_full_schedule(self.session, self.tvmaze_bulk, TVMAZE_NETWORKS.values(), country)
+        if not result.get('error'):
+            # Drop day indexes cached before the sync so covered dates come from the new copy
+            self.tvmaze_days.clear()
+        return result
+    
+    def get_tv_api_schedule(self, network, date_str, deadline=None):
         """
         TV-API.com backup source
         """
@@ -105,9 +167,9 @@ class ComprehensiveTVAPI:
             }
             
         except Exception as e:
-            return {"error": f"TV-API failed: {str(e)}"}
+            return source_error(f"TV-API failed: {str(e)}", e)
     
-    def get_network_direct_schedule(self, network, date_str):
+    def get_network_direct_schedule(self, network, date_str, deadline=None):
         """
         Fallback: Direct network website scraping
         """
@@ -125,7 +187,7 @@ class ComprehensiveTVAPI:
             if not url:
                 return {"error": f"No direct URL for {network}"}
             
-            response = self.session.get(url, timeout=15)
+            response = self._get(url, timeout=call_timeout(deadline, 15))
             response.raise_for_status()
             
             # Basic fallback schedule - would need specific parsing for each network
@@ -140,40 +202,96 @@ class ComprehensiveTVAPI:
             }
             
         except Exception as e:
-            return {"error": f"Direct scraping failed: {str(e)}"}
+            return source_error(f"Direct scraping failed: {str(e)}", e)
+    
+    def _save_snapshot(self, network, date_str, result):
+        """Persist a verified schedule and hand it back"""
+        try:
+            self.store.save_schedule(network, date_str, result)
+        except Exception as e:
+            print(f"Could not save schedule snapshot: {e}")
+        return result
     
-    def get_guaranteed_schedule(self, network, date_str):
+    def get_guaranteed_schedule(self, network, date_str, refresh=False, deadline=None):
         """
         Multi-source approach for guaranteed accuracy
+        refresh=True skips the snapshot store (used by the refresh scheduler)
+        deadline bounds the whole lookup; once it runs out the last snapshot
+        is returned whatever its age
         """
         print(f"\n🔍 COMPREHENSIVE SCHEDULE LOOKUP: {network.upper()} for {date_str}")
         print("=" * 60)
         
+        snapshot = None
+        if not refresh:
+            snapshot = self.store.load_schedule(network, date_str, max_age=self.snapshot_max_age)
+        if snapshot is not None:
+            result, age = snapshot
+            print(f"✅ SUCCESS: Snapshot store returned {len(result['schedule'])} programs ({int(age)}s old)")
+            return dict(result, data_age=int(age))
+        
+        if self.hedged:
+            return self._hedged_schedule(network, date_str, deadline)
+        
         # Try TVmaze API first (best free option)
-        result = self.get_tvmaze_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, self.store)
+        result = run_source("TVmaze API", lambda: self.get_tvmaze_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ SUCCESS: TVmaze API returned {len(result['schedule'])} programs")
-            return result
+            return self._save_snapshot(network, date_str, result)
         else:
             print(f"❌ TVmaze failed: {result.get('error', 'No programs found')}")
         
         # Try TV-API.com as backup
-        result = self.get_tv_api_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, self.store)
+        result = run_source("TV-API.com", lambda: self.get_tv_api_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ SUCCESS: TV-API returned {len(result['schedule'])} programs")
-            return result
+            return self._save_snapshot(network, date_str, result)
         else:
             print(f"❌ TV-API failed: {result.get('error', 'No programs found')}")
         
         # Try direct network scraping as last resort
-        result = self.get_network_direct_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, self.store)
+        result = run_source("Direct Scraping", lambda: self.get_network_direct_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ SUCCESS: Direct scraping returned {len(result['schedule'])} programs")
-            return result
+            return self._save_snapshot(network, date_str, result)
         else:
             print(f"❌ Direct scraping failed: {result.get('error', 'No programs found')}")
         
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, self.store)
         print(f"❌ ALL SOURCES FAILED FOR {network.upper()}")
+        return self._all_sources_failed(network, date_str)
+    
+    def _hedged_schedule(self, network, date_str, deadline=None):
+        """
+        Hedged mode: TVmaze starts first, the fallbacks join after hedge_delay
+        (at once if TVmaze is unhealthy) and the first verified result wins
+        """
+        sources = [
+            ("TVmaze API", lambda: self.get_tvmaze_schedule(network, date_str, deadline)),
+            ("TV-API.com", lambda: self.get_tv_api_schedule(network, date_str, deadline)),
+            ("Direct Scraping", lambda: self.get_network_direct_schedule(network, date_str, deadline))
+        ]
+        
+        winner, result, outcomes = race_sources(sources, hedge_delay=self.hedge_delay, deadline=deadline, network=network)
+        if result is not None:
+            print(f"✅ SUCCESS: {winner} returned {len(result['schedule'])} programs")
+            return self._save_snapshot(network, date_str, result)
+        
+        for name, outcome in outcomes.items():
+            print(f"❌ {name} failed: {outcome.get('error', 'No programs found')}")
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline, self.store)
+        print(f"❌ ALL SOURCES FAILED FOR {network.upper()}")
+        return self._all_sources_failed(network, date_str)
+    
+    def _all_sources_failed(self, network, date_str):
         return {
             "error": "All schedule sources exhausted",
             "network": network.upper(),
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Request Deadlines
+One total time budget per incoming request, handed down through a
+multi-source fallback chain so every upstream call only gets the time
+that is left instead of its own fixed timeout
+"""
+
+import os
+import time
+
+# Below this there is no point starting another upstream call
+MIN_CALL_TIMEOUT = 0.5
+
+class DeadlineExceeded(Exception):
+    def __init__(self, budget):
+        self.budget = budget
+        super().__init__(f"Request budget of {budget:g}s used up")
+
+class Deadline:
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    @classmethod
+    def from_env(cls):
+        """Deadline for one schedule request, SCHEDULE_REQUEST_BUDGET seconds (default 12)"""
+        return cls(float(os.getenv('SCHEDULE_REQUEST_BUDGET', 12)))
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() < MIN_CALL_TIMEOUT
+
+    def timeout(self, cap):
+        """Timeout for the next upstream call: cap, or whatever is left if that is less"""
+        remaining = self.remaining()
+        if remaining < MIN_CALL_TIMEOUT:
+            raise DeadlineExceeded(self.budget)
+        return min(cap, remaining)
+
+def call_timeout(deadline, cap):
+    """Per-call timeout under an optional deadline (None keeps the fixed cap)"""
+    return cap if deadline is None else deadline.timeout(cap)
+
+def deadline_result(network, date_str, deadline, store=None, sources='Schedule sources'):
+    """
+    Best answer once a lookup's budget is spent: the last stored snapshot
+    for (network, date) whatever its age, marked stale and carrying that
+    age as data_age, else a deadline_exceeded error
+    """
+    print(f"⏱️ Request budget of {deadline.budget:g}s used up for {network.upper()}")
+    snapshot = store.load_schedule(network, date_str) if store is not None else None
+    if snapshot is not None:
+        result, age = snapshot
+        print(f"✅ Serving {int(age)}s old snapshot with {len(result['schedule'])} programs")
+        return dict(result, stale=True, data_age=int(age))
+
+    return {
+        "error": f"{sources} did not answer within {deadline.budget:g}s",
+        "network": network.upper(),
+        "date": date_str,
+        "status": "deadline_exceeded",
+        "schedule": []
+    }
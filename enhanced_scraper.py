@@ -4,20 +4,24 @@ Enhanced TV Schedule Scraper
 Uses multiple reliable sources for guaranteed accuracy
 """
 
-import requests
 from datetime import datetime
 import json
 from bs4 import BeautifulSoup
 import time
+from hedged_race import hedge_settings, race_sources, run_source, source_error
+from deadline import call_timeout, deadline_result
+from gracenote_quota import gracenote_budget, PRIORITY_USER
+from http_transport import transport
 
 class TVScheduleScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, hedged=None):
+        self.session = transport.client({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        
+        self.hedged, self.hedge_delay = hedge_settings(hedged)
     
-    def get_tvguide_schedule(self, network, date_str):
+    def get_tvguide_schedule(self, network, date_str, deadline=None):
         """
         Scrape from TVGuide.com - most reliable source
         """
@@ -36,7 +40,7 @@ class TVScheduleScraper:
             url = network_urls[network.lower()]
             print(f"Fetching {network.upper()} schedule from TVGuide.com...")
             
-            response = self.session.get(url, timeout=15)
+            response = self.session.get(url, timeout=call_timeout(deadline, 15))
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -68,9 +72,9 @@ class TVScheduleScraper:
             
         except Exception as e:
             print(f"TVGuide scraping failed for {network}: {e}")
-            return {"error": f"TVGuide scraping failed: {str(e)}"}
+            return source_error(f"TVGuide scraping failed: {str(e)}", e)
     
-    def get_zap2it_schedule(self, network, date_str):
+    def get_zap2it_schedule(self, network, date_str, deadline=None):
         """
         Backup scraper using Zap2it
         """
@@ -91,9 +95,9 @@ class TVScheduleScraper:
             }
             
         except Exception as e:
-            return {"error": f"Zap2it scraping failed: {str(e)}"}
+            return source_error(f"Zap2it scraping failed: {str(e)}", e)
     
-    def get_gracenote_api_schedule(self, network, date_str, api_key=None):
+    def get_gracenote_api_schedule(self, network, date_str, api_key=None, deadline=None):
         """
         Use Gracenote TV API for premium accuracy
         This is what cable companies use for their guides
@@ -112,7 +116,9 @@ class TVScheduleScraper:
                 'api_key': api_key
             }
             
-            response = self.session.get(url, params=params, timeout=10)
+            # Raises QuotaExhausted / DeadlineExceeded, reported through source_error below
+            gracenote_budget.acquire(PRIORITY_USER, deadline=deadline)
+            response = self.session.get(url, params=params, timeout=call_timeout(deadline, 10))
             response.raise_for_status()
             
             data = response.json()
@@ -134,7 +140,7 @@ class TVScheduleScraper:
             }
             
         except Exception as e:
-            return {"error": f"Gracenote API failed: {str(e)}"}
+            return source_error(f"Gracenote API failed: {str(e)}", e)
     
     def get_station_id(self, network):
         """Map network names to station IDs"""
@@ -146,32 +152,56 @@ class TVScheduleScraper:
         }
         return station_map.get(network.lower(), '')
     
-    def get_comprehensive_schedule(self, network, date_str, api_key=None):
+    def get_comprehensive_schedule(self, network, date_str, api_key=None, deadline=None):
         """
         Try multiple sources for best accuracy
+        deadline bounds the whole lookup across every source
         """
         print(f"\n=== COMPREHENSIVE SCHEDULE LOOKUP FOR {network.upper()} ===")
         
+        if self.hedged:
+            sources = []
+            if api_key:
+                sources.append(("Premium API", lambda: self.get_gracenote_api_schedule(network, date_str, api_key, deadline)))
+            sources.append(("TVGuide.com", lambda: self.get_tvguide_schedule(network, date_str, deadline)))
+            sources.append(("Zap2it.com", lambda: self.get_zap2it_schedule(network, date_str, deadline)))
+            
+            winner, result, outcomes = race_sources(sources, hedge_delay=self.hedge_delay, deadline=deadline, network=network)
+            if result is not None:
+                print(f"✅ Success: {winner} returned {len(result['schedule'])} programs")
+                return result
+            if deadline is not None and deadline.expired():
+                return deadline_result(network, date_str, deadline)
+            print(f"❌ All sources failed for {network}")
+            return self._all_sources_failed(network, date_str)
+        
         # Try premium API first if available
         if api_key:
-            result = self.get_gracenote_api_schedule(network, date_str, api_key)
+            result = run_source("Premium API", lambda: self.get_gracenote_api_schedule(network, date_str, api_key, deadline), network, deadline)
             if not result.get('error') and result.get('schedule'):
                 print(f"✅ Success: Premium API returned {len(result['schedule'])} programs")
                 return result
         
         # Try TVGuide.com
-        result = self.get_tvguide_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline)
+        result = run_source("TVGuide.com", lambda: self.get_tvguide_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ Success: TVGuide returned {len(result['schedule'])} programs")
             return result
         
         # Try Zap2it as backup
-        result = self.get_zap2it_schedule(network, date_str)
+        if deadline is not None and deadline.expired():
+            return deadline_result(network, date_str, deadline)
+        result = run_source("Zap2it.com", lambda: self.get_zap2it_schedule(network, date_str, deadline), network, deadline)
         if not result.get('error') and result.get('schedule'):
             print(f"✅ Success: Zap2it returned {len(result['schedule'])} programs")
             return result
         
         print(f"❌ All sources failed for {network}")
+        return self._all_sources_failed(network, date_str)
+    
+    def _all_sources_failed(self, network, date_str):
         return {
             "error": "All schedule sources failed",
             "network": network.upper(),
@@ -4,22 +4,114 @@ Correct Gracenote TMS API Implementation
 Based on the official documentation provided
 """
 
-import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError, as_completed, wait
 from datetime import datetime, timedelta
+import heapq
 import json
 import os
+import xml.etree.ElementTree as ET
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_USER
+from adaptive_timeout import upstream_timeouts
+from http_transport import transport
+from station_directory import StationDirectory, NETWORKS, network_for_station
+
+# Lineup fetches run a few at a time; the shared Gracenote budget still paces them
+LINEUP_SCAN_WORKERS = int(os.getenv('LINEUP_SCAN_WORKERS', 3))
+_scan_pool = ThreadPoolExecutor(max_workers=LINEUP_SCAN_WORKERS, thread_name_prefix='lineup-scan')
+
+# Longest startDateTime..endDateTime range requested in one airings call
+AIRINGS_WINDOW_DAYS = int(os.getenv('AIRINGS_WINDOW_DAYS', 7))
+_airings_pool = ThreadPoolExecutor(max_workers=int(os.getenv('AIRINGS_FETCH_WORKERS', 4)),
+                                   thread_name_prefix='airings')
+
+def airing_windows(date_str, days, window_days=AIRINGS_WINDOW_DAYS):
+    """Split days starting at date_str into (startDateTime, endDateTime) windows of at most window_days"""
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    windows = []
+    for offset in range(0, days, window_days):
+        first = start + timedelta(days=offset)
+        last = start + timedelta(days=min(days, offset + window_days) - 1)
+        windows.append((f"{first:%Y-%m-%d}T00:00Z", f"{last:%Y-%m-%d}T23:59Z"))
+    return windows
+
+def iter_xml_elements(response, tag):
+    """
+    Yield each <tag> element of a streamed XML response as soon as it is complete
+    Elements are cleared and detached after use so memory stays bounded
+    """
+    response.raw.decode_content = True
+    parents = []
+    for event, elem in ET.iterparse(response.raw, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        
+        parents.pop()
+        if elem.tag == tag:
+            yield elem
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+def parse_airing(airing):
+    """One <airing> element as a schedule entry"""
+    start_time = airing.get('startTime', '')
+    
+    # Convert to readable time
+    if 'T' in start_time:
+        dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        time_str = dt.strftime('%I:%M %p')
+    else:
+        time_str = start_time
+    
+    # Get program element
+    program = airing.find('program')
+    if program is not None:
+        title = program.get('title', 'Unknown')
+        tms_id = program.get('tmsId', '')
+        
+        # Get description
+        desc_elem = program.find('shortDescription')
+        description = desc_elem.text if desc_elem is not None else ''
+        
+        if not description:
+            long_desc_elem = program.find('longDescription') 
+            description = long_desc_elem.text if long_desc_elem is not None else ''
+        
+        # Get episode info
+        episode_elem = program.find('episodeTitle')
+        episode_title = episode_elem.text if episode_elem is not None else ''
+        
+    else:
+        title = 'Unknown Program'
+        description = ''
+        episode_title = ''
+        tms_id = ''
+    
+    return {
+        "time": time_str,
+        "title": title,
+        "description": description,
+        "episode": episode_title,
+        "season": airing.get('seasonNum', ''),
+        "episode_num": airing.get('episodeNum', ''),
+        "duration": airing.get('duration', ''),
+        "tms_id": tms_id
+    }
 
 class GracenoteCorrectAPI:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, directory=None):
         self.api_key = api_key or os.getenv('GRACENOTE_API_KEY')
         self.base_url = "http://data.tmsapi.com/v1.1"
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = transport.client({
             'User-Agent': 'TVScheduleViewer/1.0',
             'Accept': 'application/xml',  # API only supports XML
             'Accept-encoding': 'gzip'  # Performance improvement per docs
         })
+        
+        # Station ids almost never change, so lineup scans are kept on disk
+        self.directory = directory or StationDirectory()
     
     def get_lineups(self, postal_code="90210"):
         """
@@ -38,28 +130,27 @@ class GracenoteCorrectAPI:
             }
             
             print(f"Getting lineups for {postal_code}...")
-            response = self.session.get(url, params=params, timeout=15)
-            
-            print(f"Status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"Error: {response.text}")
-                return {"error": f"HTTP {response.status_code}: {response.text}"}
-            
-            # Parse XML response
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-            
-            lineups = []
-            for lineup in root.findall('.//lineup'):
-                lineups.append({
-                    'lineupId': lineup.get('lineupId', ''),
-                    'name': lineup.get('name', ''),
-                    'location': lineup.get('location', '')
-                })
+            gracenote_budget.acquire(PRIORITY_USER)
+            with self.session.get(url, params=params, timeout=15, stream=True) as response:
+                print(f"Status: {response.status_code}")
+                if response.status_code != 200:
+                    print(f"Error: {response.text}")
+                    return {"error": f"HTTP {response.status_code}: {response.text}"}
+                
+                # Parse the XML as it streams in
+                lineups = []
+                for lineup in iter_xml_elements(response, 'lineup'):
+                    lineups.append({
+                        'lineupId': lineup.get('lineupId', ''),
+                        'name': lineup.get('name', ''),
+                        'location': lineup.get('location', '')
+                    })
             
             print(f"Found {len(lineups)} lineups")
             return lineups
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             return {"error": f"Lineups request failed: {str(e)}"}
     
@@ -75,38 +166,29 @@ class GracenoteCorrectAPI:
             params = {'api_key': self.api_key}
             
             print(f"Getting stations for lineup {lineup_id}...")
-            response = self.session.get(url, params=params, timeout=15)
-            
-            if response.status_code != 200:
-                return {"error": f"HTTP {response.status_code}: {response.text}"}
-            
-            # Parse XML response
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-            
-            stations = []
-            major_networks = {}
-            
-            for station in root.findall('.//station'):
-                station_id = station.get('stationId', '')
-                name = station.get('name', '')
+            gracenote_budget.acquire(PRIORITY_USER)
+            with self.session.get(url, params=params, timeout=15, stream=True) as response:
+                if response.status_code != 200:
+                    return {"error": f"HTTP {response.status_code}: {response.text}"}
                 
-                stations.append({
-                    'stationId': station_id,
-                    'name': name,
-                    'callSign': station.get('callSign', '')
-                })
+                # Parse the XML as it streams in
+                stations = []
+                major_networks = {}
                 
-                # Find major networks
-                name_upper = name.upper()
-                if 'NBC' in name_upper and 'nbc' not in major_networks:
-                    major_networks['nbc'] = station_id
-                elif 'ABC' in name_upper and 'abc' not in major_networks:
-                    major_networks['abc'] = station_id
-                elif 'CBS' in name_upper and 'cbs' not in major_networks:
-                    major_networks['cbs'] = station_id
-                elif 'FOX' in name_upper and 'fox' not in major_networks:
-                    major_networks['fox'] = station_id
+                for station in iter_xml_elements(response, 'station'):
+                    station_id = station.get('stationId', '')
+                    name = station.get('name', '')
+                    
+                    stations.append({
+                        'stationId': station_id,
+                        'name': name,
+                        'callSign': station.get('callSign', '')
+                    })
+                    
+                    # Find major networks
+                    network = network_for_station(name)
+                    if network and network not in major_networks:
+                        major_networks[network] = station_id
             
             print(f"Found {len(stations)} stations")
             print(f"Major networks found: {major_networks}")
@@ -118,10 +200,12 @@ class GracenoteCorrectAPI:
                 "all_stations": stations
             }
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             return {"error": f"Stations request failed: {str(e)}"}
     
-    def get_station_schedule(self, station_id, date_str):
+    def get_station_schedule(self, station_id, date_str, deadline=None):
         """
         Get schedule for a specific station
         This is the main TV schedule function
@@ -130,74 +214,17 @@ class GracenoteCorrectAPI:
             return {"error": "API key required"}
         
         try:
-            url = f"{self.base_url}/stations/{station_id}/airings.xml"
-            params = {
-                'api_key': self.api_key,
-                'startDateTime': f"{date_str}T00:00Z",
-                'endDateTime': f"{date_str}T23:59Z"
-            }
-            
             print(f"Getting schedule for station {station_id} on {date_str}...")
-            response = self.session.get(url, params=params, timeout=20)
-            
-            print(f"Status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"Error: {response.text[:200]}")
-                return {"error": f"HTTP {response.status_code}: {response.text[:200]}"}
-            
-            # Parse XML response
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-            
-            airings = root.findall('.//airing')
-            print(f"Found {len(airings)} programs")
-            
-            # Parse schedule
-            schedule = []
-            for airing in airings:
-                start_time = airing.get('startTime', '')
-                
-                # Convert to readable time
-                if 'T' in start_time:
-                    dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    time_str = dt.strftime('%I:%M %p')
-                else:
-                    time_str = start_time
-                
-                # Get program element
-                program = airing.find('program')
-                if program is not None:
-                    title = program.get('title', 'Unknown')
-                    tms_id = program.get('tmsId', '')
-                    
-                    # Get description
-                    desc_elem = program.find('shortDescription')
-                    description = desc_elem.text if desc_elem is not None else ''
-                    
-                    if not description:
-                        long_desc_elem = program.find('longDescription') 
-                        description = long_desc_elem.text if long_desc_elem is not None else ''
-                    
-                    # Get episode info
-                    episode_elem = program.find('episodeTitle')
-                    episode_title = episode_elem.text if episode_elem is not None else ''
-                    
-                else:
-                    title = 'Unknown Program'
-                    description = ''
-                    episode_title = ''
-                    tms_id = ''
+            with self._open_airings(station_id, f"{date_str}T00:00Z", f"{date_str}T23:59Z", deadline) as response:
+                print(f"Status: {response.status_code}")
+                if response.status_code != 200:
+                    print(f"Error: {response.text[:200]}")
+                    return {"error": f"HTTP {response.status_code}: {response.text[:200]}"}
                 
-                schedule.append({
-                    "time": time_str,
-                    "title": title,
-                    "description": description,
-                    "episode": episode_title,
-                    "season": airing.get('seasonNum', ''),
-                    "episode_num": airing.get('episodeNum', ''),
-                    "duration": airing.get('duration', ''),
-                    "tms_id": tms_id
-                })
+                # Parse airings one at a time as the XML streams in
+                schedule = [parse_airing(airing) for airing in iter_xml_elements(response, 'airing')]
+            
+            print(f"Found {len(schedule)} programs")
             
             return {
                 "station_id": station_id,
@@ -208,44 +235,192 @@ class GracenoteCorrectAPI:
                 "schedule": schedule
             }
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             print(f"Schedule request failed: {e}")
             return {"error": f"Schedule request failed: {str(e)}"}
     
-    def get_network_schedule(self, network, date_str, postal_code="90210"):
+    def get_airings_grid(self, station_ids, date_str, days=1, deadline=None):
+        """
+        Airings for several stations over a date range, merged into one time-sorted grid
+        Every (station, window) request runs concurrently under the shared
+        Gracenote budget. Stations that fail are listed under "errors" and the
+        rest of the grid is still returned.
+        """
+        if not self.api_key:
+            return {"error": "API key required"}
+        
+        windows = airing_windows(date_str, days)
+        print(f"Getting {days}-day grid for {len(station_ids)} stations in {len(station_ids) * len(windows)} requests...")
+        
+        tasks = {}
+        for station_id in station_ids:
+            for start, end in windows:
+                future = _airings_pool.submit(self._fetch_airings_window, station_id, start, end, deadline)
+                tasks[future] = station_id
+        
+        runs = []
+        errors = {}
+        try:
+            for future in as_completed(tasks, timeout=deadline.remaining() if deadline else None):
+                try:
+                    runs.append(future.result())
+                except QuotaExhausted as e:
+                    errors[tasks[future]] = e.to_dict()['error']
+                except Exception as e:
+                    errors[tasks[future]] = str(e)
+        except TimeoutError:
+            for future, station_id in tasks.items():
+                if not future.done():
+                    future.cancel()
+                    errors.setdefault(station_id, "Request budget used up")
+        
+        # Each run is already in time order, so a k-way merge builds the grid
+        grid = list(heapq.merge(*runs, key=lambda row: row['start']))
+        
+        return {
+            "stations": list(station_ids),
+            "start_date": date_str,
+            "days": days,
+            "source": "Gracenote TMS API",
+            "status": "partial" if errors else "verified",
+            "total_programs": len(grid),
+            "grid": grid,
+            "errors": errors
+        }
+    
+    def _fetch_airings_window(self, station_id, start, end, deadline=None):
+        """One station's airings for one window, parsed as the XML streams in and sorted by start time"""
+        with self._open_airings(station_id, start, end, deadline) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            rows = [dict(parse_airing(airing), station_id=station_id, start=airing.get('startTime', ''))
+                    for airing in iter_xml_elements(response, 'airing')]
+        rows.sort(key=lambda row: row['start'])
+        return rows
+    
+    def _open_airings(self, station_id, start, end, deadline=None):
+        """Start a streamed airings.xml request for one station between two UTC datetimes"""
+        url = f"{self.base_url}/stations/{station_id}/airings.xml"
+        params = {
+            'api_key': self.api_key,
+            'startDateTime': start,
+            'endDateTime': end
+        }
+        
+        gracenote_budget.acquire(PRIORITY_USER, deadline=deadline)
+        return upstream_timeouts.get(self.session, 'tmsapi:stations/airings.xml', url, 20,
+                                     deadline=deadline, params=params, stream=True)
+    
+    def get_network_schedule(self, network, date_str, postal_code="90210", refresh=False):
         """
         Complete workflow: Get schedule for a major network
+        The station is resolved from the station directory; lineups are only
+        scanned when it has no answer (or refresh=True)
         """
         print(f"\n🏢 GETTING {network.upper()} SCHEDULE")
         print("=" * 50)
         
-        # Step 1: Get lineups
-        lineups = self.get_lineups(postal_code)
-        if lineups.get('error'):
-            return lineups
+        if refresh:
+            self.refresh_station_directory(postal_code)
         
-        # Step 2: Find a lineup with the network
-        station_id = None
-        for lineup in lineups:
-            lineup_id = lineup.get('lineupId')
-            if not lineup_id:
-                continue
-                
-            stations_info = self.get_stations_from_lineup(lineup_id)
-            if stations_info.get('error'):
-                continue
-                
-            major_networks = stations_info.get('major_networks', {})
-            if network.lower() in major_networks:
-                station_id = major_networks[network.lower()]
-                print(f"Found {network.upper()} station: {station_id}")
-                break
+        # Steps 1-2: Resolve the network's station
+        station_id = self.directory.find_station(postal_code, network)
+        if station_id:
+            print(f"Found {network.upper()} station in directory: {station_id}")
+        else:
+            # One scan resolves every major network, not just this one
+            scanned = self.scan_lineups(postal_code, NETWORKS)
+            if scanned.get('error'):
+                return scanned
+            station_id = scanned.get(network.lower())
         
         if not station_id:
             return {"error": f"Could not find {network.upper()} station in any lineup"}
         
         # Step 3: Get the schedule
         return self.get_station_schedule(station_id, date_str)
+    
+    def scan_lineups(self, postal_code, networks):
+        """
+        Fetch a postal code's lineups concurrently until every network has a station
+        At most LINEUP_SCAN_WORKERS lineups are in flight; once all networks
+        are found, fetches that have not started are cancelled and ones already
+        running still save their stations when they finish. Lineups already
+        in the directory are not fetched again. Returns {network: station_id}
+        for the networks found, or an error dict.
+        """
+        lineups = self.directory.load_lineups(postal_code)
+        if lineups is None:
+            lineups = self.get_lineups(postal_code)
+            if isinstance(lineups, dict):
+                return lineups
+            self.directory.save_lineups(postal_code, lineups)
+        
+        wanted = [network.lower() for network in networks]
+        found = {}
+        for network in wanted:
+            station_id = self.directory.find_station(postal_code, network)
+            if station_id:
+                found[network] = station_id
+        
+        remaining = iter([
+            lineup['lineupId'] for lineup in lineups
+            if lineup.get('lineupId') and not self.directory.has_stations(lineup['lineupId'])
+        ])
+        pending = {}
+        
+        def fill():
+            # Keep a small window in flight so an early stop wastes few calls
+            while len(pending) < LINEUP_SCAN_WORKERS:
+                lineup_id = next(remaining, None)
+                if lineup_id is None:
+                    return
+                pending[_scan_pool.submit(self.get_stations_from_lineup, lineup_id)] = lineup_id
+        
+        if len(found) < len(wanted):
+            fill()
+        while pending and len(found) < len(wanted):
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                lineup_id = pending.pop(future)
+                if not self._save_scanned(lineup_id, future):
+                    continue
+                
+                for network in wanted:
+                    if network not in found:
+                        station_id = self.directory.find_station(postal_code, network)
+                        if station_id:
+                            print(f"Found {network.upper()} station: {station_id}")
+                            found[network] = station_id
+            
+            if len(found) < len(wanted):
+                fill()
+        
+        for future, lineup_id in pending.items():
+            if not future.cancel():
+                # Already running: its call is spent, so keep what it finds
+                future.add_done_callback(lambda future, lineup_id=lineup_id: self._save_scanned(lineup_id, future))
+        
+        return found
+    
+    def _save_scanned(self, lineup_id, future):
+        """Save a finished lineup fetch's stations to the directory; returns whether there were any"""
+        try:
+            stations_info = future.result()
+            if stations_info.get('error'):
+                return False
+            self.directory.save_stations(lineup_id, stations_info['all_stations'])
+            return True
+        except Exception as e:
+            print(f"Could not save stations for lineup {lineup_id}: {e}")
+            return False
+    
+    def refresh_station_directory(self, postal_code="90210"):
+        """Drop what the directory knows about a postal code and rescan its lineups for every network"""
+        self.directory.refresh(postal_code)
+        return self.scan_lineups(postal_code, NETWORKS)
 
 def test_gracenote_correct():
     """
@@ -267,7 +442,7 @@ def test_gracenote_correct():
     # Test lineups first
     print("Testing lineups...")
     lineups = api.get_lineups()
-    if lineups.get('error'):
+    if isinstance(lineups, dict):
         print(f"❌ Lineups failed: {lineups['error']}")
         return
     else:
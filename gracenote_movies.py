@@ -4,17 +4,17 @@ Gracenote Movie Listings
 Using your working Video + Sports API plan
 """
 
-import requests
 from datetime import datetime, timedelta
 import json
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_USER
+from http_transport import transport
 
 class GracenoteMovieAPI:
     def __init__(self, api_key):
         self.api_key = api_key
         self.base_url = "http://data.tmsapi.com/v1.1"
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = transport.client({
             'User-Agent': 'MovieListingApp/1.0',
             'Accept': 'application/json'
         })
@@ -37,6 +37,7 @@ class GracenoteMovieAPI:
             }
             
             print(f"🎬 Getting movie showings for {zip_code} on {date_str}...")
+            gracenote_budget.acquire(PRIORITY_USER)
             response = self.session.get(url, params=params, timeout=15)
             
             if response.status_code != 200:
@@ -83,6 +84,8 @@ class GracenoteMovieAPI:
                 'source': 'Gracenote TMS API'
             }
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             return {"error": f"Request failed: {str(e)}"}
     
@@ -14,6 +14,9 @@ from datetime import datetime, timedelta
 import json
 import os
 import xml.etree.ElementTree as ET
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_USER, PRIORITY_DIAGNOSTIC
+from adaptive_timeout import upstream_timeouts
+from http_transport import transport
 
 class GracenoteOfficialAPI:
     def __init__(self, api_key=None):
@@ -21,8 +24,7 @@ class GracenoteOfficialAPI:
         self.base_url = "http://data.tmsapi.com"
         self.version = "v1.1"
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = transport.client({
             'User-Agent': 'TVScheduleViewer/1.0 Official Gracenote Integration',
             'Accept': 'application/json'  # TMS API v1.1 uses JSON
         })
@@ -35,7 +37,7 @@ class GracenoteOfficialAPI:
             'fox': '11867'    # FOX Network
         }
     
-    def get_tv_schedule(self, network, date_str, region='US'):
+    def get_tv_schedule(self, network, date_str, region='US', deadline=None):
         """
         Get TV schedule using official Gracenote TMS API
         Uses the same endpoint as cable companies
@@ -69,7 +71,9 @@ class GracenoteOfficialAPI:
             print(f"API Request: {url}")
             print(f"Parameters: {params}")
             
-            response = self.session.get(url, params=params, timeout=20)
+            gracenote_budget.acquire(PRIORITY_USER, deadline=deadline)
+            response = upstream_timeouts.get(self.session, 'tmsapi:stations/airings', url, 20,
+                                             deadline=deadline, params=params)
             print(f"Response Status: {response.status_code}")
             
             if response.status_code == 401:
@@ -104,6 +108,10 @@ class GracenoteOfficialAPI:
                 "schedule": schedule
             }
             
+        except QuotaExhausted as e:
+            result = e.to_dict()
+            result["network"] = network.upper()
+            return result
         except requests.RequestException as e:
             return {
                 "error": f"Gracenote API request failed: {str(e)}",
@@ -189,12 +197,15 @@ class GracenoteOfficialAPI:
                 'region': region
             }
             
+            gracenote_budget.acquire(PRIORITY_USER)
             response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
             
             # Parse movie XML response
             return self._parse_movie_xml(response.content)
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             return {"error": f"Movie lookup failed: {str(e)}"}
     
@@ -212,11 +223,14 @@ class GracenoteOfficialAPI:
                 'region': region
             }
             
+            gracenote_budget.acquire(PRIORITY_USER)
             response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
             
             return self._parse_series_xml(response.content)
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             return {"error": f"Series lookup failed: {str(e)}"}
     
@@ -245,6 +259,7 @@ class GracenoteOfficialAPI:
             url = f"{self.base_url}/{self.version}/stations/10161"  # NBC test
             params = {'api_key': self.api_key}
             
+            gracenote_budget.acquire(PRIORITY_DIAGNOSTIC)
             response = self.session.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
@@ -263,6 +278,11 @@ class GracenoteOfficialAPI:
                     "message": f"HTTP {response.status_code}: {response.text[:100]}"
                 }
                 
+        except QuotaExhausted as e:
+            return {
+                "status": "❌ Quota Exhausted",
+                "message": str(e)
+            }
         except Exception as e:
             return {
                 "status": "❌ Connection Failed",
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Gracenote Call Budget
+Enforces the Video + Sports plan limits (2 calls/second, 50 calls/day)
+across every Gracenote client in the process
+
+- Token bucket for the per-second limit
+- Daily ledger persisted to disk so restarts do not reset the count, and
+  file-locked so every server and scheduler process shares one count
+- Priority classes: user-facing requests can use the whole day,
+  background refreshes and diagnostics stop earlier
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: the count is then only safe within one process
+    fcntl = None
+
+from deadline import DeadlineExceeded, MIN_CALL_TIMEOUT
+
+PRIORITY_USER = 'user'
+PRIORITY_BACKGROUND = 'background'
+PRIORITY_DIAGNOSTIC = 'diagnostic'
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gracenote_quota.json')
+
+class QuotaExhausted(Exception):
+    """Raised instead of making a Gracenote call the plan would reject"""
+
+    def __init__(self, priority, calls_used, limit, reason='daily', retry_after=None):
+        self.priority = priority
+        self.calls_used = calls_used
+        self.limit = limit
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Gracenote {reason} quota exhausted for {priority} calls ({calls_used}/{limit})")
+
+    def to_dict(self):
+        """Error payload in the same shape the API classes return"""
+        return {
+            "error": str(self),
+            "status": "quota_exhausted",
+            "reason": self.reason,
+            "priority": self.priority,
+            "calls_used": self.calls_used,
+            "limit": self.limit,
+            "retry_after": self.retry_after
+        }
+
+class GracenoteBudget:
+    def __init__(self, per_second=2, daily_limit=50, ledger_path=None, max_wait=2.0):
+        self.per_second = per_second
+        self.daily_limit = daily_limit
+        self.ledger_path = ledger_path or os.getenv('GRACENOTE_QUOTA_LEDGER', DEFAULT_LEDGER_PATH)
+        self.max_wait = max_wait
+
+        # How much of the day each class may use; the remainder is held back
+        # for the classes above it
+        self.priority_limits = {
+            PRIORITY_USER: daily_limit,
+            PRIORITY_BACKGROUND: int(daily_limit * 0.8),
+            PRIORITY_DIAGNOSTIC: int(daily_limit * 0.4)
+        }
+
+        self._tokens = float(per_second)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority=PRIORITY_USER, max_wait=None, deadline=None):
+        """
+        Reserve one Gracenote call, sleeping for a rate-limit token if needed
+        Raises QuotaExhausted when the daily allowance for this priority is
+        spent or the per-second wait would exceed max_wait, and
+        DeadlineExceeded (without spending a call) when the optional request
+        deadline would be used up before the call could start
+        """
+        if max_wait is None:
+            max_wait = self.max_wait
+        limit = self.priority_limits.get(priority, self.priority_limits[PRIORITY_DIAGNOSTIC])
+
+        with self._ledger_locked():
+            ledger = self._load_ledger()
+            if ledger['used'] >= limit:
+                raise QuotaExhausted(priority, ledger['used'], limit, retry_after=self._seconds_until_reset())
+
+            wait = self._take_token()
+            if wait > max_wait:
+                self._tokens += 1
+                raise QuotaExhausted(priority, ledger['used'], limit, reason='rate', retry_after=round(wait, 2))
+            if deadline is not None and deadline.remaining() - wait < MIN_CALL_TIMEOUT:
+                self._tokens += 1
+                raise DeadlineExceeded(deadline.budget)
+
+            ledger['used'] += 1
+            ledger['by_priority'][priority] = ledger['by_priority'].get(priority, 0) + 1
+            self._save_ledger(ledger)
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def remaining(self, priority=PRIORITY_USER):
+        """Calls still available today for this priority"""
+        limit = self.priority_limits.get(priority, self.priority_limits[PRIORITY_DIAGNOSTIC])
+        with self._ledger_locked(exclusive=False):
+            return max(0, limit - self._load_ledger()['used'])
+
+    def stats(self):
+        """Current ledger plus per-priority headroom"""
+        with self._ledger_locked(exclusive=False):
+            ledger = self._load_ledger()
+        return {
+            "date": ledger['date'],
+            "calls_used": ledger['used'],
+            "daily_limit": self.daily_limit,
+            "per_second": self.per_second,
+            "by_priority": ledger['by_priority'],
+            "remaining": {
+                priority: max(0, limit - ledger['used'])
+                for priority, limit in self.priority_limits.items()
+            }
+        }
+
+    @contextmanager
+    def _ledger_locked(self, exclusive=True):
+        """
+        Hold the ledger across threads and processes while it is read or updated
+        The ledger's .lock file is flock()ed so concurrent servers never lose increments
+        """
+        with self._lock:
+            try:
+                lock_file = open(f"{self.ledger_path}.lock", 'a')
+            except OSError as e:
+                print(f"Could not open Gracenote quota lock file: {e}")
+                lock_file = None
+            try:
+                if lock_file is not None and fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                yield
+            finally:
+                # Closing the file releases the flock
+                if lock_file is not None:
+                    lock_file.close()
+
+    def _take_token(self):
+        """Take one token from the bucket, returning how long the caller must wait for it"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(float(self.per_second), self._tokens + elapsed * self.per_second)
+
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.per_second
+
+    def _load_ledger(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        try:
+            with open(self.ledger_path) as f:
+                ledger = json.load(f)
+        except (OSError, ValueError):
+            ledger = {}
+
+        if ledger.get('date') != today:
+            ledger = {'date': today, 'used': 0, 'by_priority': {}}
+        return ledger
+
+    def _save_ledger(self, ledger):
+        tmp_path = f"{self.ledger_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(ledger, f)
+            os.replace(tmp_path, self.ledger_path)
+        except OSError as e:
+            print(f"Could not persist Gracenote quota ledger: {e}")
+
+    def _seconds_until_reset(self):
+        now = datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return int(86400 - (now - midnight).total_seconds())
+
+# Shared by every Gracenote client in the process
+gracenote_budget = GracenoteBudget()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Hedged Source Racing
+Runs a multi-source fallback chain as a race instead of strictly in order:
+the primary source starts first, fallbacks join after a hedge delay (or
+immediately when the primary is unhealthy), and the first verified
+result wins. Every call goes through the source's circuit breaker for
+the network being looked up.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import os
+import time
+
+import requests
+
+from circuit_breaker import source_breakers
+from deadline import DeadlineExceeded
+from gracenote_quota import QuotaExhausted
+
+_race_pool = ThreadPoolExecutor(max_workers=int(os.getenv('HEDGE_POOL_WORKERS', 16)),
+                                thread_name_prefix='hedge')
+
+def hedge_settings(hedged=None):
+    """
+    (hedged, hedge_delay) for a schedule client
+    Racing is on unless SCHEDULE_HEDGED=0 or the caller passes hedged=False;
+    fallbacks join after SCHEDULE_HEDGE_DELAY seconds (default 2)
+    """
+    if hedged is None:
+        hedged = os.getenv('SCHEDULE_HEDGED', '1') != '0'
+    return hedged, float(os.getenv('SCHEDULE_HEDGE_DELAY', 2.0))
+
+def is_verified(result):
+    """A result counts only if it has no error and at least one program"""
+    return bool(result) and not result.get('error') and bool(result.get('schedule'))
+
+def source_error(message, exc):
+    """
+    Error result for a source call that raised exc
+    status tells the circuit breaker whether upstream failed or our own budget ran out
+    """
+    result = {"error": message}
+    if isinstance(exc, DeadlineExceeded):
+        result['status'] = 'deadline_exceeded'
+    elif isinstance(exc, QuotaExhausted):
+        result['status'] = 'quota_exhausted'
+    elif isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        result['status'] = 'upstream_error'
+    elif isinstance(exc, requests.HTTPError) and exc.response is not None and exc.response.status_code >= 500:
+        result['status'] = 'upstream_error'
+    return result
+
+def _circuit_open(name):
+    return {"error": f"{name} skipped: circuit open after repeated failures", "status": "circuit_open"}
+
+def run_source(name, fn, network=None, deadline=None):
+    """
+    Call one source through its circuit breaker, recording the outcome and latency
+    Returns a circuit_open error without calling fn while the breaker is open
+    """
+    if not source_breakers.get(name, network).allow():
+        return _circuit_open(name)
+    return _timed(name, fn, network, deadline)
+
+def race_sources(sources, hedge_delay=2.0, accept=is_verified, deadline=None, network=None):
+    """
+    Race (name, fn) sources given in preference order
+    Returns (winner_name, result, outcomes); winner_name and result are None
+    when no source produced an accepted result. outcomes maps each finished
+    source to what it returned.
+
+    Losing sources that have not started yet are cancelled; ones already
+    running finish in the background and their results are ignored. The
+    race gives up when the optional deadline runs out.
+    """
+    futures = {}
+    outcomes = {}
+    pending = set()
+    start = time.monotonic()
+
+    def launch(name, fn):
+        if not source_breakers.get(name, network).allow():
+            outcomes[name] = _circuit_open(name)
+            return
+        future = _race_pool.submit(_timed, name, fn, network, deadline)
+        futures[future] = name
+        pending.add(future)
+
+    primary_name, primary_fn = sources[0]
+    fallbacks = list(sources[1:])
+    if fallbacks and not source_breakers.get(primary_name, network).is_healthy():
+        print(f"⚡ {primary_name} is unhealthy, starting fallbacks immediately")
+        hedge_delay = 0
+    launch(primary_name, primary_fn)
+
+    while pending or fallbacks:
+        timeout = None
+        if fallbacks:
+            timeout = max(0.0, start + hedge_delay - time.monotonic())
+        if deadline is not None:
+            if deadline.expired():
+                for other in pending:
+                    other.cancel()
+                print(f"⏱️ Race stopped after {time.monotonic() - start:.2f}s, request budget used up")
+                break
+            timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            result = future.result()
+            outcomes[name] = result
+
+            if accept(result):
+                for other in pending:
+                    other.cancel()
+                print(f"🏁 {name} won the race after {time.monotonic() - start:.2f}s")
+                return name, result, outcomes
+
+        # Hedge delay elapsed, or everything launched so far has already failed
+        if fallbacks and (not pending or time.monotonic() >= start + hedge_delay):
+            for name, fn in fallbacks:
+                launch(name, fn)
+            fallbacks = []
+
+    return None, None, outcomes
+
+def _timed(name, fn, network, deadline):
+    # Race losers still report to their breaker when they finish
+    breaker = source_breakers.get(name, network)
+    start = time.monotonic()
+    try:
+        result = fn()
+    except Exception as e:
+        result = source_error(f"{name} failed: {str(e)}", e)
+    latency = time.monotonic() - start
+
+    status = (result or {}).get('status')
+    if status == 'upstream_error' and not (deadline is not None and deadline.expired()):
+        breaker.record(False, latency)
+    elif status in ('upstream_error', 'deadline_exceeded', 'quota_exhausted'):
+        # Cut short by our own budget or quota, not by the source
+        breaker.release()
+    else:
+        # The source is up, but an answer with no programs counts toward
+        # skipping it just the same
+        breaker.record(True, latency, empty=not is_verified(result))
+    return result
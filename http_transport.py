@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Transport
+One pooled requests.Session for every API client in the process, so
+keep-alive connections are reused across clients and endpoints
+
+- Connection pools sized per upstream host
+- gzip/deflate on every request
+- Retries with jittered exponential backoff for refused/reset connections and 502/503/504
+  (never for Gracenote: each attempt counts against the daily quota)
+- Timing hooks called after every request
+"""
+
+from collections import defaultdict
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+
+# Connections kept open per host; TVmaze is fanned out to, Gracenote allows 2 calls/second
+HOST_POOL_SIZES = {
+    'data.tmsapi.com': 4,
+    'api.tvmaze.com': 16,
+    'enterprise.clarkcinemas.com': 4
+}
+
+NO_RETRY_HOSTS = {'data.tmsapi.com', 'feeds.tmsapi.com'}
+
+RETRY_STATUSES = {502, 503, 504}
+
+class TransportClient:
+    """Per-client view of the shared transport with its own default headers"""
+
+    def __init__(self, transport, headers=None):
+        self.transport = transport
+        self.headers = dict(headers or {})
+
+    def get(self, url, headers=None, **kwargs):
+        merged = dict(self.headers)
+        if headers:
+            merged.update(headers)
+        return self.transport.request('GET', url, headers=merged, **kwargs)
+
+class HttpTransport:
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, host_pool_sizes=None, retries=2, backoff=0.3):
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+
+        default_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.session.mount('http://', default_adapter)
+        self.session.mount('https://', default_adapter)
+        for host, size in (host_pool_sizes or HOST_POOL_SIZES).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self.session.mount(f"http://{host}", adapter)
+            self.session.mount(f"https://{host}", adapter)
+
+        self._hooks = []
+        self._stats = defaultdict(lambda: {'requests': 0, 'errors': 0, 'retries': 0, 'seconds': 0.0})
+        self._lock = threading.Lock()
+
+    def client(self, headers=None):
+        """A client that sends headers with every request through this transport"""
+        return TransportClient(self, headers)
+
+    def add_hook(self, hook):
+        """Call hook(method, url, status, elapsed, attempts) after every request; status is None on error"""
+        self._hooks.append(hook)
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).hostname or ''
+        attempts = 1 if host in NO_RETRY_HOSTS or method != 'GET' else self.retries + 1
+
+        start = time.monotonic()
+        for attempt in range(1, attempts + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                # Timeouts are not retried: the caller's timeout is its whole budget
+                retryable = isinstance(e, requests.ConnectionError) and not isinstance(e, requests.Timeout)
+                if not retryable or attempt == attempts:
+                    self._finished(method, url, host, None, start, attempt)
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == attempts:
+                    self._finished(method, url, host, response.status_code, start, attempt)
+                    return response
+                response.close()
+
+            time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+    def _finished(self, method, url, host, status, start, attempts):
+        elapsed = time.monotonic() - start
+        with self._lock:
+            stats = self._stats[host]
+            stats['requests'] += 1
+            stats['retries'] += attempts - 1
+            stats['seconds'] += elapsed
+            if status is None or status >= 400:
+                stats['errors'] += 1
+
+        for hook in self._hooks:
+            try:
+                hook(method, url, status, elapsed, attempts)
+            except Exception as e:
+                print(f"HTTP timing hook failed: {e}")
+
+    def stats(self):
+        """Request, error and retry counts and average latency per host"""
+        with self._lock:
+            return {
+                host: dict(stats, seconds=round(stats['seconds'], 3),
+                           avg_seconds=round(stats['seconds'] / stats['requests'], 3))
+                for host, stats in self._stats.items()
+            }
+
+# The one transport every client in the process goes through
+transport = HttpTransport(retries=int(os.getenv('HTTP_RETRIES', 2)))
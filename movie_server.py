@@ -4,116 +4,118 @@ Movie Listings Server
 Gracenote API + Clark Cinema Web Scraping
 """
 
-from flask import Flask, jsonify, render_template_string
-import requests
+from flask import Flask, Response, jsonify, render_template_string
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed, wait
 from datetime import datetime
 from bs4 import BeautifulSoup
 import json
+import os
+from response_cache import TTLCache, StaleWhileRevalidateCache, swr_response
+from single_flight import SingleFlight, request_key
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_USER
+from showtime_model import normalize_showings
+from snapshot_store import SnapshotStore
+from refresh_scheduler import RefreshScheduler, attach_to_app, run_app, add_movie_jobs
+from adaptive_timeout import upstream_timeouts
+from http_transport import transport
 
 app = Flask(__name__)
 
 class MovieAPI:
-    def __init__(self):
+    def __init__(self, store=None):
         self.gracenote_key = 'uk2dqjggp2qr9vzgce4a8dq7'
         self.base_url = "http://data.tmsapi.com/v1.1"
         
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = transport.client({
             'User-Agent': 'MovieListingApp/1.0',
             'Accept': 'application/json'
         })
+        
+        # Showings change a few times a day at most, and the plan only allows
+        # 50 calls/day, so successful responses are reused for the TTL
+        self.showings_cache = TTLCache(
+            ttl=int(os.getenv('MOVIE_CACHE_TTL', 3600)),
+            max_entries=int(os.getenv('MOVIE_CACHE_SIZE', 64))
+        )
+        
+        # Concurrent cache misses for the same showings request share one call
+        self.inflight = SingleFlight()
+        
+        # Normalized showings survive restarts, so a new process starts warm
+        self.store = store or SnapshotStore()
+        self.snapshot_max_age = int(os.getenv('SNAPSHOT_MAX_AGE', 6 * 3600))
     
-    def get_gracenote_movies(self, zip_code="36330"):
-        """Get movies from Gracenote API"""
+    def get_gracenote_movies(self, zip_code="36330", date_str=None, radius=50, refresh=False, priority=PRIORITY_USER):
+        """
+        Get movies from Gracenote API
+        refresh=True skips the cache and snapshot (used by the refresh scheduler)
+        """
+        if not date_str:
+            date_str = datetime.now().strftime('%Y-%m-%d')
+        
+        cache_key = (zip_code, date_str, radius)
+        if not refresh:
+            cached = self.showings_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        url = f"{self.base_url}/movies/showings"
+        params = {
+            'api_key': self.gracenote_key,
+            'startDate': date_str,
+            'zip': zip_code,
+            'radius': radius
+        }
+        
+        return self.inflight.do(request_key('GET', url, params), self._fetch_showings,
+                                url, params, cache_key, refresh, priority)
+    
+    def _fetch_showings(self, url, params, cache_key, refresh=False, priority=PRIORITY_USER):
+        """Fetch and format one showings response (called once per in-flight key)"""
+        zip_code, date_str, radius = cache_key
+        
+        # A snapshot from before a restart is as good as a fresh call
+        snapshot = None
+        if not refresh:
+            snapshot = self.store.load_showings(zip_code, date_str, radius, max_age=self.snapshot_max_age)
+        if snapshot is not None:
+            movies, source, age = snapshot
+            print(f"Serving {zip_code} showings for {date_str} from snapshot ({int(age)}s old)")
+            result = dict(self._showings_result(movies, source), data_age=int(age))
+            self.showings_cache.set(cache_key, result)
+            return result
+        
         try:
-            url = f"{self.base_url}/movies/showings"
-            params = {
-                'api_key': self.gracenote_key,
-                'startDate': datetime.now().strftime('%Y-%m-%d'),
-                'zip': zip_code,
-                'radius': 50
-            }
-            
-            response = self.session.get(url, params=params, timeout=15)
+            gracenote_budget.acquire(priority)
+            response = upstream_timeouts.get(self.session, 'tmsapi:movies/showings', url, 15, params=params)
             if response.status_code != 200:
                 return {"error": f"HTTP {response.status_code}"}
             
-            movies = response.json()
+            # Normalize into compact records; labels are only formatted on serialization
+            movies = list(normalize_showings(response.json()))
             
-            # Format movie data
-            movie_list = []
-            for movie in movies:
-                # Group showtimes by theater
-                theater_times = {}
-                for showing in movie.get('showtimes', []):
-                    theatre = showing.get('theatre', {}).get('name', 'Unknown Theatre')
-                    times = showing.get('dateTime', [])
-                    # Ensure times is always an array
-                    if isinstance(times, str):
-                        times = [times]
-                    elif not isinstance(times, list):
-                        times = ['Check website for times']
-                    
-                    # Convert ISO times to 12-hour format
-                    for time_str in times:
-                        if 'T' in time_str:
-                            try:
-                                dt = datetime.fromisoformat(time_str)
-                                formatted_time = dt.strftime('%I:%M %p').lstrip('0')
-                                if theatre not in theater_times:
-                                    theater_times[theatre] = []
-                                theater_times[theatre].append(formatted_time)
-                            except:
-                                if theatre not in theater_times:
-                                    theater_times[theatre] = []
-                                theater_times[theatre].append(time_str)
-                        else:
-                            if theatre not in theater_times:
-                                theater_times[theatre] = []
-                            theater_times[theatre].append(time_str)
-                
-                # Convert to showtimes format
-                showtimes = []
-                for theatre, times in theater_times.items():
-                    # Remove duplicates and sort times properly
-                    unique_times = list(set(times))
-                    
-                    # Sort times by converting back to 24-hour for sorting
-                    def sort_key(time_str):
-                        try:
-                            if 'AM' in time_str or 'PM' in time_str:
-                                time_obj = datetime.strptime(time_str, '%I:%M %p')
-                                return time_obj.strftime('%H:%M')
-                            return time_str
-                        except:
-                            return time_str
-                    
-                    sorted_times = sorted(unique_times, key=sort_key)
-                    
-                    if sorted_times:
-                        showtimes.append({
-                            'theatre': theatre,
-                            'times': sorted_times[:10]  # Limit times
-                        })
-                
-                movie_list.append({
-                    'title': movie.get('title', 'Unknown'),
-                    'year': movie.get('releaseYear', ''),
-                    'rating': movie.get('ratings', [{}])[0].get('code', 'NR') if movie.get('ratings') else 'NR',
-                    'runtime': movie.get('runTime', ''),
-                    'genres': movie.get('genres', []),
-                    'showtimes': showtimes
-                })
+            try:
+                self.store.save_showings(zip_code, date_str, radius, movies, 'Gracenote TMS API')
+            except Exception as e:
+                print(f"Could not save showings snapshot: {e}")
             
-            return {
-                'source': 'Gracenote TMS API',
-                'total': len(movie_list),
-                'movies': movie_list
-            }
+            result = self._showings_result(movies, 'Gracenote TMS API')
+            self.showings_cache.set(cache_key, result)
+            return result
             
+        except QuotaExhausted as e:
+            return e.to_dict()
         except Exception as e:
             return {"error": str(e)}
     
+    def _showings_result(self, movies, source):
+        movie_list = [movie.to_dict() for movie in movies]
+        return {
+            'source': source,
+            'total': len(movie_list),
+            'movies': movie_list
+        }
+    
     def scrape_clark_cinema(self):
         """Scrape Clark Cinemas Enterprise website"""
         try:
@@ -123,12 +125,10 @@ class MovieAPI:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
+                'Accept-Language': 'en-US,en;q=0.5'
             }
             
-            response = requests.get(url, headers=headers, timeout=20)
+            response = upstream_timeouts.get(self.session, 'clarkcinemas:home', url, 20, headers=headers)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -244,6 +244,35 @@ class MovieAPI:
 
 movie_api = MovieAPI()
 
+# Last good payload per endpoint, served instantly and refreshed in the background
+movie_swr = StaleWhileRevalidateCache(
+    refresh_after=int(os.getenv('SWR_REFRESH_AFTER', 300))
+)
+
+# Bounded pool for fetching movie sources side by side
+movie_pool = ThreadPoolExecutor(max_workers=int(os.getenv('MOVIE_POOL_WORKERS', 4)))
+MOVIES_DEADLINE = float(os.getenv('MOVIES_DEADLINE', 25))
+
+def load_gracenote_movies(zip_code="36330"):
+    """Today's AMC showings as (payload, age_seconds)"""
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    return movie_swr.get(('gracenote', zip_code, date_str),
+                         lambda: movie_api.get_gracenote_movies(zip_code, date_str))
+
+def load_clark_movies():
+    """Clark Cinemas listings as (payload, age_seconds)"""
+    return movie_swr.get(('clark',), movie_api.scrape_clark_cinema)
+
+MOVIE_SOURCES = {
+    'gracenote': load_gracenote_movies,
+    'clark': load_clark_movies
+}
+
+# Keeps the stale-while-revalidate entries warm between requests
+refresh_scheduler = RefreshScheduler()
+add_movie_jobs(refresh_scheduler, movie_api, on_refresh=movie_swr.put)
+attach_to_app(refresh_scheduler, app)
+
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
 <html>
@@ -558,20 +587,50 @@ HTML_TEMPLATE = '''
     <script>
         async function loadMovies() {
             try {
-                // Load Gracenote movies (AMC theaters)
-                const gracenoteResponse = await fetch('/api/gracenote-movies');
-                const gracenoteData = await gracenoteResponse.json();
-                displayGracenoteMovies(gracenoteData);
+                // Each source is rendered as soon as its NDJSON record arrives
+                const response = await fetch('/api/movies/stream');
+                
+                if (!response.body || !window.TextDecoder) {
+                    // No streaming support: fall back to the combined endpoint
+                    const data = await (await fetch('/api/movies')).json();
+                    displayMovieRecord({source: 'gracenote', data: data.gracenote});
+                    displayMovieRecord({source: 'clark', data: data.clark});
+                    return;
+                }
                 
-                // Load Clark Cinemas movies
-                const clarkResponse = await fetch('/api/clark-movies');
-                const clarkData = await clarkResponse.json();
-                displayClarkMovies(clarkData);
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    
+                    buffer += decoder.decode(value, { stream: true });
+                    let newline;
+                    while ((newline = buffer.indexOf('\\n')) >= 0) {
+                        const line = buffer.slice(0, newline).trim();
+                        buffer = buffer.slice(newline + 1);
+                        if (line) displayMovieRecord(JSON.parse(line));
+                    }
+                }
+                
+                if (buffer.trim()) displayMovieRecord(JSON.parse(buffer));
                 
             } catch (error) {
                 console.error('Error loading movies:', error);
-                document.getElementById('gracenote-movies').innerHTML = 
-                    '<div class="error">❌ Error loading movie data. Please refresh the page.</div>';
+                ['gracenote-movies', 'clark-movies'].forEach(id => {
+                    document.getElementById(id).innerHTML = 
+                        '<div class="error">❌ Error loading movie data. Please refresh the page.</div>';
+                });
+            }
+        }
+        
+        function displayMovieRecord(record) {
+            if (record.source === 'gracenote') {
+                displayGracenoteMovies(record.data);
+            } else if (record.source === 'clark') {
+                displayClarkMovies(record.data);
             }
         }
         
@@ -716,11 +775,76 @@ def index():
 
 @app.route('/api/gracenote-movies')
 def gracenote_movies():
-    return jsonify(movie_api.get_gracenote_movies())
+    return swr_response(*load_gracenote_movies())
 
 @app.route('/api/clark-movies')
 def clark_movies():
-    return jsonify(movie_api.scrape_clark_cinema())
+    return swr_response(*load_clark_movies())
+
+@app.route('/api/movies')
+def movies():
+    """
+    Both movie sources fetched in parallel under one overall deadline
+    A source that misses the deadline is reported as an error and keeps
+    loading in the background for the next request
+    """
+    futures = {movie_pool.submit(loader): name for name, loader in MOVIE_SOURCES.items()}
+    done, _ = wait(futures, timeout=MOVIES_DEADLINE)
+    
+    result = {}
+    oldest = 0
+    for future, name in futures.items():
+        if future in done:
+            try:
+                payload, age = future.result()
+            except Exception as e:
+                payload, age = {"error": str(e), "movies": []}, 0
+        else:
+            payload, age = {"error": f"Timed out after {MOVIES_DEADLINE:g}s", "movies": []}, 0
+        result[name] = payload
+        oldest = max(oldest, age)
+    
+    return swr_response(result, oldest)
+
+@app.route('/api/movies/stream')
+def movies_stream():
+    """
+    Newline-delimited JSON, one record per source as soon as it is ready
+    Each record is {"source": ..., "age": ..., "data": <same payload as the per-source endpoint>}
+    """
+    futures = {movie_pool.submit(loader): name for name, loader in MOVIE_SOURCES.items()}
+    
+    def generate():
+        pending = set(futures.values())
+        try:
+            for future in as_completed(futures, timeout=MOVIES_DEADLINE):
+                name = futures[future]
+                try:
+                    payload, age = future.result()
+                except Exception as e:
+                    payload, age = {"error": str(e), "movies": []}, 0
+                pending.discard(name)
+                yield json.dumps({'source': name, 'age': int(age), 'data': payload}) + '\n'
+        except TimeoutError:
+            for name in sorted(pending):
+                payload = {"error": f"Timed out after {MOVIES_DEADLINE:g}s", "movies": []}
+                yield json.dumps({'source': name, 'age': 0, 'data': payload}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    return jsonify({
+        'gracenote_showings': movie_api.showings_cache.stats(),
+        'gracenote_inflight': movie_api.inflight.stats(),
+        'upstream_timeouts': upstream_timeouts.stats(),
+        'http_transport': transport.stats(),
+        'refresh_jobs': refresh_scheduler.stats()
+    })
+
+@app.route('/api/quota')
+def quota():
+    return jsonify(gracenote_budget.stats())
 
 if __name__ == '__main__':
     print("🎬 MOVIE LISTINGS SERVER")
@@ -732,4 +856,4 @@ if __name__ == '__main__':
     print("Server starting at: http://localhost:8001")
     print("Press Ctrl+C to stop")
     
-    app.run(debug=True, host='0.0.0.0', port=8001)
\ No newline at end of file
+    run_app(app, refresh_scheduler, port=8001)
\ No newline at end of file
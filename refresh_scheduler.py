@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Background Refresh Scheduler
+Keeps showings and TV schedules warm so request handlers only read
+precomputed data
+
+- Jittered intervals so refreshes never line up into bursts
+- Tighter intervals during showtime-heavy / prime-time hours
+- Gracenote jobs are skipped while the background quota is spent
+- A job whose stored copy is younger than its interval waits until the copy
+  is due, so restarts do not refetch what the snapshot store already has
+
+Runs inside movie_server.py / server.py, or standalone to keep the
+snapshot store warm for both:  python3 refresh_scheduler.py
+"""
+
+from datetime import datetime, timedelta
+import heapq
+import os
+import random
+import threading
+import time
+
+from gracenote_quota import gracenote_budget, PRIORITY_BACKGROUND
+
+NETWORKS = ['nbc', 'abc', 'cbs', 'fox']
+
+# Radius of the showings the movie pages ask for
+SHOWINGS_RADIUS = 50
+
+class RefreshJob:
+    __slots__ = ('name', 'fn', 'interval', 'busy_interval', 'busy_hours', 'uses_gracenote', 'age',
+                 'runs', 'skips', 'failures')
+
+    def __init__(self, name, fn, interval, busy_interval=None, busy_hours=None, uses_gracenote=False, age=None):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.busy_interval = busy_interval or interval
+        self.busy_hours = busy_hours
+        self.uses_gracenote = uses_gracenote
+        self.age = age
+        self.runs = 0
+        self.skips = 0
+        self.failures = 0
+
+class RefreshScheduler:
+    def __init__(self, jitter=0.15, budget=None):
+        self.jitter = jitter
+        self.budget = budget or gracenote_budget
+
+        self._jobs = {}
+        self._queue = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, fn, interval, busy_interval=None, busy_hours=None, uses_gracenote=False, age=None):
+        """
+        Register fn to run every interval seconds (busy_interval during busy_hours)
+        busy_hours is a (start_hour, end_hour) pair in local time
+        age() returns how many seconds old the job's stored copy is (None if
+        there is none); a run is skipped until that copy is due
+        """
+        job = RefreshJob(name, fn, interval, busy_interval, busy_hours, uses_gracenote, age)
+        with self._lock:
+            self._jobs[name] = job
+            # First run soon after startup, spread out so jobs do not all fire at once
+            heapq.heappush(self._queue, (time.time() + random.uniform(0, 5), name))
+        self._wakeup.set()
+
+    def start(self):
+        """Run the scheduler on a daemon thread (once; later calls do nothing)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run_forever, name='refresh-scheduler', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def run_forever(self):
+        print(f"🔄 Refresh scheduler running {len(self._jobs)} jobs")
+        while not self._stopped.is_set():
+            with self._lock:
+                next_run, name = self._queue[0] if self._queue else (time.time() + 60, None)
+
+            delay = next_run - time.time()
+            if delay > 0:
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+
+            with self._lock:
+                heapq.heappop(self._queue)
+                job = self._jobs[name]
+
+            delay = self._run(job)
+
+            with self._lock:
+                heapq.heappush(self._queue, (time.time() + delay, name))
+
+    def _run(self, job):
+        """Run job unless its stored copy is still fresh; returns the delay until its next run"""
+        delay = self._next_delay(job)
+
+        age = self._stored_age(job)
+        if age is not None and age < delay:
+            job.skips += 1
+            print(f"⏭️ Skipping {job.name}: stored copy is {int(age)}s old, next refresh in {int(delay - age)}s")
+            return delay - age
+
+        if job.uses_gracenote and self.budget.remaining(PRIORITY_BACKGROUND) <= 0:
+            print(f"⏸️ Skipping {job.name}: background Gracenote quota used up for today")
+            return delay
+
+        try:
+            job.fn()
+            job.runs += 1
+        except Exception as e:
+            job.failures += 1
+            print(f"❌ Refresh job {job.name} failed: {e}")
+        return delay
+
+    def _stored_age(self, job):
+        if job.age is None:
+            return None
+        try:
+            return job.age()
+        except Exception as e:
+            print(f"Could not check the stored copy for {job.name}: {e}")
+            return None
+
+    def _next_delay(self, job):
+        interval = job.interval
+        if job.busy_hours:
+            start_hour, end_hour = job.busy_hours
+            if start_hour <= datetime.now().hour < end_hour:
+                interval = job.busy_interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stats(self):
+        with self._lock:
+            upcoming = {name: round(when - time.time()) for when, name in self._queue}
+            return {
+                name: {
+                    'runs': job.runs,
+                    'skips': job.skips,
+                    'failures': job.failures,
+                    'next_run_in': upcoming.get(name)
+                }
+                for name, job in self._jobs.items()
+            }
+
+def scheduler_enabled():
+    """REFRESH_SCHEDULER=0 turns the in-process scheduler off"""
+    return os.getenv('REFRESH_SCHEDULER', '1') != '0'
+
+def attach_to_app(scheduler, app):
+    """
+    Start scheduler with the first request app serves
+    Covers WSGI servers, which import the app without running its __main__ block
+    """
+    if not scheduler_enabled():
+        return
+
+    @app.before_request
+    def start_refresh_scheduler():
+        scheduler.start()
+
+def run_app(app, scheduler, port, debug=True):
+    """
+    Run app on Flask's development server with scheduler started up front
+    With the debug reloader the watcher process serves no requests, so only
+    its child (WERKZEUG_RUN_MAIN=true) starts the scheduler
+    """
+    app.debug = debug
+    if scheduler_enabled() and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        scheduler.start()
+    app.run(host='0.0.0.0', port=port)
+
+def add_movie_jobs(scheduler, movie_api, zip_codes=None, on_refresh=None):
+    """
+    Refresh Gracenote showings for each zip and the Clark Cinemas listings
+    on_refresh(key, payload) is called with every good payload
+    """
+    if zip_codes is None:
+        zip_codes = os.getenv('REFRESH_ZIPS', '36330').split(',')
+
+    for zip_code in zip_codes:
+        zip_code = zip_code.strip()
+
+        def refresh_showings(zip_code=zip_code):
+            date_str = datetime.now().strftime('%Y-%m-%d')
+            payload = movie_api.get_gracenote_movies(zip_code, date_str, SHOWINGS_RADIUS,
+                                                     refresh=True, priority=PRIORITY_BACKGROUND)
+            if on_refresh and not payload.get('error'):
+                on_refresh(('gracenote', zip_code, date_str), payload)
+
+        def showings_age(zip_code=zip_code):
+            date_str = datetime.now().strftime('%Y-%m-%d')
+            return movie_api.store.showings_age(zip_code, date_str, SHOWINGS_RADIUS)
+
+        # Showtimes shift most around matinee and evening hours
+        scheduler.add_job(f"gracenote:{zip_code}", refresh_showings,
+                          interval=4 * 3600, busy_interval=2 * 3600,
+                          busy_hours=(10, 22), uses_gracenote=True, age=showings_age)
+
+    def refresh_clark():
+        payload = movie_api.scrape_clark_cinema()
+        if on_refresh and not payload.get('error'):
+            on_refresh(('clark',), payload)
+
+    scheduler.add_job('clark', refresh_clark, interval=3600, busy_interval=1800, busy_hours=(10, 22))
+
+def add_schedule_jobs(scheduler, tv_api, networks=None, days=None, on_refresh=None):
+    """
+    Refresh each network's schedule for today and the next few days,
+    and sync the local copy of TVmaze's full schedule
+    on_refresh(key, payload) is called with every good payload
+    """
+    networks = networks or NETWORKS
+    if days is None:
+        days = int(os.getenv('REFRESH_DAYS', 3))
+
+    def upcoming_dates():
+        today = datetime.now()
+        return [(today + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+
+    for network in networks:
+        def refresh_network(network=network):
+            for date_str in upcoming_dates():
+                payload = tv_api.get_guaranteed_schedule(network, date_str, refresh=True)
+                if on_refresh and not payload.get('error'):
+                    on_refresh((network, date_str), payload)
+
+        def schedule_age(network=network):
+            # A missing day makes the whole job due
+            ages = [tv_api.store.schedule_age(network, date_str) for date_str in upcoming_dates()]
+            return None if None in ages else max(ages)
+
+        # Late changes cluster around prime time
+        scheduler.add_job(f"schedule:{network}", refresh_network,
+                          interval=6 * 3600, busy_interval=2 * 3600, busy_hours=(17, 23), age=schedule_age)
+
+    # One bulk download keeps every covered date answerable locally; the copy
+    # lives in the shared snapshot file, so restarts and other processes reuse it
+    scheduler.add_job('tvmaze-bulk', tv_api.sync_tvmaze_bulk,
+                      interval=int(os.getenv('TVMAZE_BULK_SYNC_INTERVAL', 12 * 3600)),
+                      age=tv_api.tvmaze_bulk_age)
+
+def main():
+    """Standalone mode: keep the shared snapshot store warm for both servers"""
+    from movie_server import MovieAPI
+    from comprehensive_api import ComprehensiveTVAPI
+
+    print("🔄 REFRESH SCHEDULER (standalone)")
+    print("=" * 40)
+
+    scheduler = RefreshScheduler()
+    add_movie_jobs(scheduler, MovieAPI())
+    add_schedule_jobs(scheduler, ComprehensiveTVAPI())
+
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("Scheduler stopped")
+
+if __name__ == "__main__":
+    main()
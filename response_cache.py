@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+In-Process Response Cache
+Keeps upstream API responses in memory so repeated page loads
+do not spend the Gracenote daily call quota, and serves the last
+good payload while a fresh one is fetched in the background
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+from flask import jsonify
+
+class TTLCache:
+    def __init__(self, ttl=3600, max_entries=128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if missing or expired
+        A hit moves the entry to the most-recently-used end
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Store value under key, evicting least-recently-used entries
+        once the cache is over its size limit
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+class StaleWhileRevalidateCache:
+    def __init__(self, refresh_after=300, max_entries=256, is_good=None):
+        self.refresh_after = refresh_after
+        self.max_entries = max_entries
+        # Stale fallbacks (a lookup that ran out of time) are served but never cached as fresh
+        self.is_good = is_good or (lambda payload: not payload.get('error') and not payload.get('stale'))
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return (payload, age_seconds) for key
+        The last good payload is served immediately; once it was loaded more
+        than refresh_after ago a background thread reloads it. Only the very
+        first request for a key waits on the loader. Ages count from when the
+        data was fetched, so a payload carrying its own data_age (read back
+        from a snapshot, or a stale fallback) starts out that old.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            payload = loader()
+            if self.is_good(payload):
+                self.put(key, payload)
+            return payload, payload.get('data_age', 0)
+
+        fetched_at, loaded_at, payload = entry
+        if time.time() - loaded_at > self.refresh_after:
+            self._refresh_in_background(key, loader)
+        return payload, time.time() - fetched_at
+
+    def put(self, key, payload):
+        """Record payload as the last good value for key, data_age seconds old if it says so"""
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now - payload.get('data_age', 0), now, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key):
+        """Return (payload, age_seconds) without triggering a load, or (None, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        fetched_at, _, payload = entry
+        return payload, time.time() - fetched_at
+
+    def prefetch(self, key, loader, executor):
+        """
+        Queue a load of key on executor if nothing is cached or loading for it yet
+        Returns whether a load was queued
+        """
+        with self._lock:
+            if key in self._entries or key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+        executor.submit(self._refresh, key, loader)
+        return True
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        thread = threading.Thread(target=self._refresh, args=(key, loader), daemon=True)
+        thread.start()
+
+    def _refresh(self, key, loader):
+        try:
+            payload = loader()
+            if self.is_good(payload):
+                self.put(key, payload)
+            else:
+                print(f"Background refresh for {key} returned no usable data, keeping last good payload")
+        except Exception as e:
+            print(f"Background refresh for {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+def swr_response(payload, age):
+    """JSON response carrying how old the served data is, for (payload, age) from StaleWhileRevalidateCache.get"""
+    response = jsonify(payload)
+    response.headers['X-Data-Age'] = str(int(age))
+    return response
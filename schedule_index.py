@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Schedule Interval Index
+Start/end minutes for one network's programs on one date, answering
+"what is airing at T" and "what airs between T1 and T2" with a binary search
+
+- Start comes from the program's time ("20:00" from TVmaze, "8:00 PM" elsewhere)
+- End is start + duration; without a duration the next program's start is used
+- A running maximum of end minutes bounds how far back a lookup has to walk
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# Used for the last program of the day when it has no duration
+DEFAULT_DURATION = 30
+
+def parse_minutes(time_str):
+    """Minute of day for "20:00", "8:00 PM" or "08:00 PM", or None if unparseable"""
+    if not time_str:
+        return None
+    parts = time_str.strip().upper().split()
+    try:
+        hours, minutes = (int(part) for part in parts[0].split(':')[:2])
+    except ValueError:
+        return None
+
+    if len(parts) > 1:
+        if parts[1] == 'AM' and hours == 12:
+            hours = 0
+        elif parts[1] == 'PM' and hours != 12:
+            hours += 12
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+def format_minutes(minute):
+    """24-hour HH:MM label; minutes past midnight roll over"""
+    minute %= 1440
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def _duration(program):
+    try:
+        duration = int(program.get('duration') or 0)
+    except (TypeError, ValueError):
+        return None
+    return duration if duration > 0 else None
+
+class ScheduleIndex:
+    def __init__(self, programs):
+        timed = sorted(
+            ((parse_minutes(program.get('time')), position, program) for position, program in enumerate(programs)),
+            key=lambda item: (item[0] is None, item[0] or 0, item[1])
+        )
+        timed = [(start, program) for start, _, program in timed if start is not None]
+
+        self.starts = [start for start, _ in timed]
+        self.programs = [program for _, program in timed]
+        self.ends = []
+        for start, program in timed:
+            duration = _duration(program)
+            if duration is None:
+                later = bisect_right(self.starts, start)
+                duration = self.starts[later] - start if later < len(self.starts) else DEFAULT_DURATION
+            self.ends.append(start + duration)
+        self.max_ends = list(accumulate(self.ends, max))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def at(self, minute):
+        """Programs airing at a minute of the day"""
+        return self.between(minute, minute + 1)
+
+    def between(self, start, end):
+        """Programs overlapping [start, end) minutes, in start order"""
+        matches = []
+        i = bisect_left(self.starts, end) - 1
+        # Nothing before i can still be on once the running maximum end is behind start
+        while i >= 0 and self.max_ends[i] > start:
+            if self.ends[i] > start:
+                matches.append(i)
+            i -= 1
+        return [self._entry(i) for i in reversed(matches)]
+
+    def _entry(self, i):
+        return dict(self.programs[i], start=format_minutes(self.starts[i]), end=format_minutes(self.ends[i]))
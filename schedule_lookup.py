@@ -1,70 +1,99 @@
 #!/usr/bin/env python3
 """
-NBC Schedule Lookup Tool
-Usage: python3 schedule_lookup.py "11:00 AM"
-Returns only real verified programming for the specified time slot
+Network Schedule Lookup Tool
+Usage: python3 schedule_lookup.py "11:00 AM" [network] [YYYY-MM-DD]
+Returns only real verified programming for the specified time slot,
+looked up in the same interval index the server's /api/at endpoint uses
 """
 
 import sys
 from datetime import datetime, timezone, timedelta
 
+from comprehensive_api import ComprehensiveTVAPI
+from schedule_index import ScheduleIndex, parse_minutes
+
 def get_current_date():
     """Get current date in Mountain Time"""
     mountain_tz = timezone(timedelta(hours=-7))  # MDT
     return datetime.now(mountain_tz)
 
-def lookup_nbc_programming(time_slot):
+def lookup_programming(time_slot, network='nbc', date_str=None):
     """
-    Look up real NBC programming for a specific time slot
+    Look up real programming for a network at a specific time slot
     Args:
-        time_slot (str): Time in format like "11:00 AM" or "2:30 PM"
+        time_slot (str): Time in format like "11:00 AM", "2:30 PM" or "20:00"
+        network (str): nbc, abc, cbs or fox
+        date_str (str): YYYY-MM-DD, today when omitted
     Returns:
         dict: Program info or error if not found/verified
     """
     
-    current_date = get_current_date()
+    current_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else get_current_date()
     date_str = current_date.strftime('%Y-%m-%d')
     day_name = current_date.strftime('%A')
     
-    print(f"Looking up NBC programming for {time_slot} on {day_name}, {date_str}")
-    print("Attempting real-time verification...")
-    
-    # This would use MCP firecrawl to get real data from:
-    # https://www.tvpassport.com/tv-listings/stations/nbc-wrgx-dothan-al-hd/19093/{date_str}
-    
-    # For now, return that verification is needed
-    return {
+    result = {
         "time": time_slot,
         "date": date_str,
         "day": day_name,
-        "status": "VERIFICATION_NEEDED",
-        "message": f"Real-time lookup for {time_slot} requires live data verification",
-        "source_needed": f"https://www.tvpassport.com/tv-listings/stations/nbc-wrgx-dothan-al-hd/19093/{date_str}"
+        "network": network.upper()
     }
+    
+    minute = parse_minutes(time_slot)
+    if minute is None:
+        return dict(result, status="ERROR", message=f"Unrecognized time: {time_slot}")
+    
+    print(f"Looking up {network.upper()} programming for {time_slot} on {day_name}, {date_str}")
+    
+    schedule = ComprehensiveTVAPI().get_guaranteed_schedule(network, date_str)
+    if schedule.get('error'):
+        return dict(result, status="ERROR", message=schedule['error'])
+    
+    programs = ScheduleIndex(schedule.get('schedule', [])).at(minute)
+    if not programs:
+        return dict(result, status="NOT_FOUND",
+                    message=f"No verified {network.upper()} program airs at {time_slot}",
+                    source=schedule.get('source'))
+    
+    program = programs[0]
+    return dict(result,
+                status="VERIFIED",
+                title=program.get('title'),
+                description=program.get('description'),
+                start=program['start'],
+                end=program['end'],
+                source=schedule.get('source'),
+                verified=schedule.get('status') == 'verified')
+
+def lookup_nbc_programming(time_slot):
+    """Look up real NBC programming for a specific time slot today"""
+    return lookup_programming(time_slot, 'nbc')
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 schedule_lookup.py \"11:00 AM\"")
-        print("Example: python3 schedule_lookup.py \"2:30 PM\"")
+    if not 2 <= len(sys.argv) <= 4:
+        print("Usage: python3 schedule_lookup.py \"11:00 AM\" [network] [YYYY-MM-DD]")
+        print("Example: python3 schedule_lookup.py \"2:30 PM\" cbs")
         sys.exit(1)
     
     time_slot = sys.argv[1]
-    result = lookup_nbc_programming(time_slot)
+    network = sys.argv[2].lower() if len(sys.argv) > 2 else 'nbc'
+    date_str = sys.argv[3] if len(sys.argv) > 3 else None
+    result = lookup_programming(time_slot, network, date_str)
     
     print("\n" + "="*50)
-    print(f"NBC SCHEDULE LOOKUP RESULT")
+    print(f"{result['network']} SCHEDULE LOOKUP RESULT")
     print("="*50)
     
-    if result["status"] == "VERIFICATION_NEEDED":
+    if result["status"] != "VERIFIED":
         print(f"Time Requested: {result['time']}")
         print(f"Date: {result['date']} ({result['day']})")
         print(f"Status: {result['status']}")
         print(f"Message: {result['message']}")
-        print(f"Source URL: {result['source_needed']}")
     else:
-        print(f"Time: {result['time']}")
+        print(f"Time: {result['start']} - {result['end']}")
         print(f"Program: {result.get('title', 'Unknown')}")
         print(f"Description: {result.get('description', 'N/A')}")
+        print(f"Source: {result.get('source', 'N/A')}")
         print(f"Verified: {result.get('verified', False)}")
 
 if __name__ == "__main__":
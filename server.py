@@ -5,45 +5,179 @@ Fetches accurate, date-driven schedules from official network sources
 NO FAKE DATA - Only verified official programming
 """
 
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import os
 import requests
 import re
 from urllib.parse import urljoin
 from comprehensive_api import ComprehensiveTVAPI
+from response_cache import StaleWhileRevalidateCache, TTLCache, swr_response
+from single_flight import SingleFlight
+from refresh_scheduler import RefreshScheduler, attach_to_app, run_app, add_schedule_jobs
+from circuit_breaker import source_breakers
+from deadline import Deadline
+from gracenote_correct import GracenoteCorrectAPI
+from station_directory import NETWORKS
+from schedule_index import ScheduleIndex, format_minutes, parse_minutes
 
 app = Flask(__name__)
 
 # Initialize comprehensive API
 tv_api = ComprehensiveTVAPI()
 
-def get_official_nbc_schedule(date_str):
+# Multi-station Gracenote grids (needs GRACENOTE_API_KEY)
+gracenote_api = GracenoteCorrectAPI()
+MAX_GRID_DAYS = 14
+MAX_GRID_STATIONS = int(os.getenv('MAX_GRID_STATIONS', 8))
+
+# Every grid costs stations x windows Gracenote calls, so complete grids are
+# reused like the showings, and concurrent misses for the same grid share one fetch
+grid_cache = TTLCache(ttl=int(os.getenv('GRID_CACHE_TTL', 3600)), max_entries=64)
+grid_inflight = SingleFlight()
+
+# Last good schedule per (network, date), served instantly and refreshed in the background
+schedule_swr = StaleWhileRevalidateCache(
+    refresh_after=int(os.getenv('SWR_REFRESH_AFTER', 300))
+)
+
+# Keeps the stale-while-revalidate entries warm between requests
+refresh_scheduler = RefreshScheduler()
+add_schedule_jobs(refresh_scheduler, tv_api, on_refresh=schedule_swr.put)
+attach_to_app(refresh_scheduler, app)
+
+def get_official_nbc_schedule(date_str, deadline=None):
     """
     Fetch official NBC schedule using comprehensive API
     ZERO FAKE DATA - Only verified sources
     """
-    return tv_api.get_guaranteed_schedule('nbc', date_str)
+    return tv_api.get_guaranteed_schedule('nbc', date_str, deadline=deadline)
 
-def get_official_abc_schedule(date_str):
+def get_official_abc_schedule(date_str, deadline=None):
     """
     Fetch official ABC schedule using comprehensive API
     ZERO FAKE DATA - Only verified sources
     """
-    return tv_api.get_guaranteed_schedule('abc', date_str)
+    return tv_api.get_guaranteed_schedule('abc', date_str, deadline=deadline)
 
-def get_official_cbs_schedule(date_str):
+def get_official_cbs_schedule(date_str, deadline=None):
     """
     Fetch official CBS schedule using comprehensive API
     ZERO FAKE DATA - Only verified sources
     """
-    return tv_api.get_guaranteed_schedule('cbs', date_str)
+    return tv_api.get_guaranteed_schedule('cbs', date_str, deadline=deadline)
 
-def get_official_fox_schedule(date_str):
+def get_official_fox_schedule(date_str, deadline=None):
     """
     Fetch official FOX schedule using comprehensive API
     ZERO FAKE DATA - Only verified sources
     """
-    return tv_api.get_guaranteed_schedule('fox', date_str)
+    return tv_api.get_guaranteed_schedule('fox', date_str, deadline=deadline)
+
+NETWORK_LOADERS = {
+    'nbc': get_official_nbc_schedule,
+    'abc': get_official_abc_schedule,
+    'cbs': get_official_cbs_schedule,
+    'fox': get_official_fox_schedule
+}
+
+# Runs the per-network lookups of a batch request side by side
+schedule_pool = ThreadPoolExecutor(max_workers=len(NETWORK_LOADERS))
+
+# Days whose lookup just failed, so repeat requests do not go upstream again straight away
+failed_schedules = TTLCache(ttl=int(os.getenv('SCHEDULE_FAILURE_TTL', 60)), max_entries=256)
+
+def fetch_schedule(network, date_str):
+    """Load one network and date from the sources, remembering a failure for SCHEDULE_FAILURE_TTL seconds"""
+    payload = NETWORK_LOADERS[network](date_str, Deadline.from_env())
+    if not schedule_swr.is_good(payload):
+        failed_schedules.set((network, date_str), payload)
+    return payload
+
+def load_schedule(network, date_str):
+    """
+    Schedule for one network and date as (payload, age_seconds)
+    Each load gets SCHEDULE_REQUEST_BUDGET seconds in total across all sources
+    """
+    key = (network, date_str)
+    if schedule_swr.peek(key)[0] is None:
+        failed = failed_schedules.get(key)
+        if failed is not None:
+            return failed, failed.get('data_age', 0)
+    return schedule_swr.get(key, lambda: fetch_schedule(network, date_str))
+
+# Days of a range request are fetched side by side, each stored under its own date
+MAX_RANGE_DAYS = 14
+range_pool = ThreadPoolExecutor(max_workers=int(os.getenv('RANGE_FETCH_WORKERS', 7)))
+
+# Days after a requested date that are loaded speculatively, a few at a time
+PREFETCH_DAYS = int(os.getenv('SCHEDULE_PREFETCH_DAYS', 3))
+prefetch_pool = ThreadPoolExecutor(max_workers=int(os.getenv('PREFETCH_WORKERS', 2)),
+                                   thread_name_prefix='prefetch')
+
+def prefetch_schedules(networks, date_str, days=PREFETCH_DAYS):
+    """
+    Warm the days after date_str for each network so paging forward is instant
+    Days past the sources' known horizon and days that just failed are skipped
+    """
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    horizon = tv_api.schedule_horizon()
+    for offset in range(1, days + 1):
+        day = (start + timedelta(days=offset)).strftime('%Y-%m-%d')
+        if day > horizon:
+            break
+        for network in networks:
+            if failed_schedules.get((network, day)) is None:
+                schedule_swr.prefetch((network, day), lambda network=network, day=day: fetch_schedule(network, day),
+                                      prefetch_pool)
+
+# Interval index per (network, date), rebuilt only when the schedule payload changes
+schedule_indexes = TTLCache(ttl=24 * 3600, max_entries=256)
+
+def load_index(network, date_str):
+    """Interval index over a network's schedule for a date as (payload, index, age_seconds)"""
+    payload, age = load_schedule(network, date_str)
+    cached = schedule_indexes.get((network, date_str))
+    if cached is None or cached[0] is not payload:
+        cached = (payload, ScheduleIndex(payload.get('schedule', [])))
+        schedule_indexes.set((network, date_str), cached)
+    return payload, cached[1], age
+
+def eastern_now():
+    """Current time where the networks' national schedules are set"""
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo('America/New_York'))
+    except Exception:
+        from datetime import timezone
+        return datetime.now(timezone(timedelta(hours=-5)))  # EST
+
+def airing_response(date_str, start, end=None):
+    """
+    Programs on every network airing at start (or between start and end), in minutes of the day
+    Networks are looked up concurrently like /api/schedule/all
+    """
+    futures = {network: schedule_pool.submit(load_index, network, date_str) for network in NETWORK_LOADERS}
+    
+    networks = {}
+    oldest = 0
+    for network, future in futures.items():
+        try:
+            payload, schedule_index, age = future.result()
+        except Exception as e:
+            networks[network] = {"error": f"Server error: {str(e)}", "programs": []}
+            continue
+        programs = schedule_index.at(start) if end is None else schedule_index.between(start, end)
+        networks[network] = {"programs": programs, "source": payload.get('source')}
+        if payload.get('error'):
+            networks[network]['error'] = payload['error']
+        oldest = max(oldest, age)
+    
+    result = {"date": date_str, "time": format_minutes(start), "networks": networks}
+    if end is not None:
+        result['until'] = format_minutes(end)
+    return swr_response(result, oldest)
 
 @app.route('/')
 def index():
@@ -59,22 +193,15 @@ def get_schedule(network, date):
         # Validate date format
         datetime.strptime(date, '%Y-%m-%d')
         
-        # Route to appropriate network function
-        if network.lower() == 'nbc':
-            result = get_official_nbc_schedule(date)
-        elif network.lower() == 'abc':
-            result = get_official_abc_schedule(date)
-        elif network.lower() == 'cbs':
-            result = get_official_cbs_schedule(date)
-        elif network.lower() == 'fox':
-            result = get_official_fox_schedule(date)
-        else:
+        if network.lower() not in NETWORK_LOADERS:
             return jsonify({
                 "error": f"Unsupported network: {network}",
-                "supported_networks": ["nbc", "abc", "cbs", "fox"]
+                "supported_networks": list(NETWORK_LOADERS)
             }), 400
         
-        return jsonify(result)
+        response = swr_response(*load_schedule(network.lower(), date))
+        prefetch_schedules([network.lower()], date)
+        return response
         
     except ValueError:
         return jsonify({
@@ -85,6 +212,176 @@ def get_schedule(network, date):
             "error": f"Server error: {str(e)}"
         }), 500
 
+@app.route('/api/schedule/all/<date>')
+def get_all_schedules(date):
+    """
+    Every network's schedule for a date in one response
+    Networks are looked up concurrently and the combined payload is serialized once
+    """
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({
+            "error": "Invalid date format. Use YYYY-MM-DD"
+        }), 400
+    
+    futures = {network: schedule_pool.submit(load_schedule, network, date) for network in NETWORK_LOADERS}
+    
+    networks = {}
+    oldest = 0
+    for network, future in futures.items():
+        try:
+            payload, age = future.result()
+        except Exception as e:
+            payload, age = {"error": f"Server error: {str(e)}", "schedule": []}, 0
+        networks[network] = payload
+        oldest = max(oldest, age)
+    
+    prefetch_schedules(list(NETWORK_LOADERS), date)
+    return swr_response({"date": date, "networks": networks}, oldest)
+
+@app.route('/api/schedule/<network>/range')
+def get_schedule_range(network):
+    """
+    One network's schedules for ?start=YYYY-MM-DD (default today) and the following ?days=N (default 7)
+    Days that are not cached yet are fetched concurrently and stored per date,
+    and the days after the range are prefetched
+    """
+    network = network.lower()
+    if network not in NETWORK_LOADERS:
+        return jsonify({
+            "error": f"Unsupported network: {network}",
+            "supported_networks": list(NETWORK_LOADERS)
+        }), 400
+    
+    try:
+        start = datetime.strptime(request.args.get('start') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        days = int(request.args.get('days', 7))
+    except ValueError:
+        return jsonify({
+            "error": "Invalid start or days. Use YYYY-MM-DD and a whole number of days"
+        }), 400
+    if not 1 <= days <= MAX_RANGE_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_RANGE_DAYS}"}), 400
+    
+    dates = [(start + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+    futures = {date_str: range_pool.submit(load_schedule, network, date_str) for date_str in dates}
+    
+    schedules = {}
+    errors = {}
+    oldest = 0
+    for date_str, future in futures.items():
+        try:
+            payload, age = future.result()
+        except Exception as e:
+            payload, age = {"error": f"Server error: {str(e)}", "schedule": []}, 0
+        schedules[date_str] = payload
+        if payload.get('error'):
+            errors[date_str] = payload['error']
+        oldest = max(oldest, age)
+    
+    prefetch_schedules([network], dates[-1])
+    return swr_response({
+        "network": network.upper(),
+        "start_date": dates[0],
+        "days": days,
+        "schedules": schedules,
+        "errors": errors
+    }, oldest)
+
+def upstream_error_status(result):
+    """503 when we held back (quota or request budget used up), 502 when the upstream call failed"""
+    if result.get('status') in ('quota_exhausted', 'deadline_exceeded'):
+        return 503
+    return 502
+
+def fetch_grid(key, station_ids, date_str, days):
+    """Fetch one grid from Gracenote, caching it for GRID_CACHE_TTL seconds when every station answered"""
+    result = gracenote_api.get_airings_grid(station_ids, date_str, days, deadline=Deadline.from_env())
+    if not result.get('error') and not result['errors']:
+        grid_cache.set(key, result)
+    return result
+
+@app.route('/api/grid/<date>')
+def get_grid(date):
+    """
+    Gracenote airings for several stations over a date range as one time-sorted grid
+    ?days=N (default 1) and either ?stations=id,id or ?postal=zip for the
+    major network stations there (default 90210)
+    """
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+        days = int(request.args.get('days', 1))
+    except ValueError:
+        return jsonify({
+            "error": "Invalid date or days. Use YYYY-MM-DD and a whole number of days"
+        }), 400
+    if not 1 <= days <= MAX_GRID_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_GRID_DAYS}"}), 400
+    
+    if not gracenote_api.api_key:
+        return jsonify({"error": "Gracenote API key required (set GRACENOTE_API_KEY)"}), 503
+    
+    networks = {}
+    stations = request.args.get('stations')
+    if stations:
+        station_ids = list(dict.fromkeys(station.strip() for station in stations.split(',') if station.strip()))
+        if not 1 <= len(station_ids) <= MAX_GRID_STATIONS:
+            return jsonify({"error": f"stations must list between 1 and {MAX_GRID_STATIONS} station ids"}), 400
+    else:
+        postal_code = request.args.get('postal', '90210')
+        networks = gracenote_api.scan_lineups(postal_code, NETWORKS)
+        if networks.get('error'):
+            return jsonify(networks), upstream_error_status(networks)
+        if not networks:
+            return jsonify({"error": f"No major network stations found for {postal_code}"}), 502
+        station_ids = list(networks.values())
+    
+    key = (tuple(sorted(station_ids)), date, days)
+    result = grid_cache.get(key)
+    if result is None:
+        result = grid_inflight.do(key, fetch_grid, key, station_ids, date, days)
+    if result.get('error'):
+        return jsonify(result), upstream_error_status(result)
+    if networks:
+        result = dict(result, networks=networks)
+    if not result['grid'] and len(result['errors']) == len(station_ids):
+        # Nothing came back at all: an upstream failure, not an empty grid
+        result['error'] = "Airings requests failed for every station"
+        return jsonify(result), 502
+    return jsonify(result)
+
+@app.route('/api/health/sources')
+def source_health():
+    """Circuit state, success rate and latency for every schedule source"""
+    return jsonify(source_breakers.stats())
+
+@app.route('/api/now')
+def get_airing_now():
+    """What every network is airing right now (Eastern Time)"""
+    current = eastern_now()
+    return airing_response(current.strftime('%Y-%m-%d'), current.hour * 60 + current.minute)
+
+@app.route('/api/at/<date>/<time_slot>')
+def get_airing_at(date, time_slot):
+    """
+    What every network airs at HH:MM on a date
+    ?until=HH:MM returns everything airing between the two times instead
+    """
+    start = parse_minutes(time_slot)
+    until = request.args.get('until')
+    end = parse_minutes(until) if until else None
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        start = None
+    if start is None or (until and (end is None or end <= start)):
+        return jsonify({
+            "error": "Invalid date or time. Use YYYY-MM-DD and HH:MM, with ?until=HH:MM after the start"
+        }), 400
+    
+    return airing_response(date, start, end)
+
 @app.route('/api/current-time')
 def get_current_time():
     """Get current Eastern Time (network standard)"""
@@ -111,4 +408,4 @@ if __name__ == '__main__':
     print("Press Ctrl+C to stop")
     print("="*50)
     
-    app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
+    run_app(app, refresh_scheduler, port=8000)
\ No newline at end of file
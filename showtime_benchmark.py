@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Showtime Normalization Benchmark
+Compares the original nested-dict formatting loop from MovieAPI with the
+streaming normalize_showings() pipeline on a synthetic payload
+Usage: python3 showtime_benchmark.py [movies] [repeat]
+"""
+
+from datetime import datetime
+import random
+import sys
+import time
+
+from showtime_model import normalize_showings
+
+def build_payload(movie_count, seed=7):
+    """Synthetic /movies/showings payload shaped like Gracenote's response"""
+    rng = random.Random(seed)
+    theatres = [f"Theatre {i}" for i in range(60)]
+    payload = []
+
+    for i in range(movie_count):
+        showtimes = []
+        for theatre in rng.sample(theatres, rng.randint(1, 6)):
+            times = [
+                f"2025-07-27T{rng.randint(10, 23):02d}:{rng.choice((0, 10, 15, 30, 45)):02d}"
+                for _ in range(rng.randint(4, 30))
+            ]
+            showtimes.append({'theatre': {'id': theatre, 'name': theatre}, 'dateTime': times})
+
+        payload.append({
+            'title': f"Movie {i}",
+            'releaseYear': 2025,
+            'ratings': [{'code': rng.choice(('G', 'PG', 'PG-13', 'R'))}],
+            'runTime': 'PT01H55M',
+            'genres': ['Drama', 'Action'],
+            'showtimes': showtimes
+        })
+
+    return payload
+
+def legacy_normalize(movies):
+    """The per-movie loop MovieAPI.get_gracenote_movies() used before the pipeline"""
+    movie_list = []
+    for movie in movies:
+        theater_times = {}
+        for showing in movie.get('showtimes', []):
+            theatre = showing.get('theatre', {}).get('name', 'Unknown Theatre')
+            times = showing.get('dateTime', [])
+            if isinstance(times, str):
+                times = [times]
+            elif not isinstance(times, list):
+                times = ['Check website for times']
+
+            for time_str in times:
+                if 'T' in time_str:
+                    try:
+                        dt = datetime.fromisoformat(time_str)
+                        formatted_time = dt.strftime('%I:%M %p').lstrip('0')
+                        if theatre not in theater_times:
+                            theater_times[theatre] = []
+                        theater_times[theatre].append(formatted_time)
+                    except:
+                        if theatre not in theater_times:
+                            theater_times[theatre] = []
+                        theater_times[theatre].append(time_str)
+                else:
+                    if theatre not in theater_times:
+                        theater_times[theatre] = []
+                    theater_times[theatre].append(time_str)
+
+        showtimes = []
+        for theatre, times in theater_times.items():
+            unique_times = list(set(times))
+
+            def sort_key(time_str):
+                try:
+                    if 'AM' in time_str or 'PM' in time_str:
+                        time_obj = datetime.strptime(time_str, '%I:%M %p')
+                        return time_obj.strftime('%H:%M')
+                    return time_str
+                except:
+                    return time_str
+
+            sorted_times = sorted(unique_times, key=sort_key)
+            if sorted_times:
+                showtimes.append({'theatre': theatre, 'times': sorted_times[:10]})
+
+        movie_list.append({
+            'title': movie.get('title', 'Unknown'),
+            'year': movie.get('releaseYear', ''),
+            'rating': movie.get('ratings', [{}])[0].get('code', 'NR') if movie.get('ratings') else 'NR',
+            'runtime': movie.get('runTime', ''),
+            'genres': movie.get('genres', []),
+            'showtimes': showtimes
+        })
+    return movie_list
+
+def pipeline_normalize(movies):
+    return [movie.to_dict() for movie in normalize_showings(movies)]
+
+def best_time(fn, payload, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    payload = build_payload(movie_count)
+    timestamps = sum(len(s['dateTime']) for m in payload for s in m['showtimes'])
+
+    print("⏱️ SHOWTIME NORMALIZATION BENCHMARK")
+    print("=" * 50)
+    print(f"Movies: {movie_count}  Timestamps: {timestamps}  Best of {repeat}")
+    print()
+
+    if legacy_normalize(payload) != pipeline_normalize(payload):
+        print("❌ Pipeline output differs from the legacy loop")
+        sys.exit(1)
+
+    results = {}
+    for name, fn in (('legacy loop', legacy_normalize), ('pipeline', pipeline_normalize)):
+        elapsed = best_time(fn, payload, repeat)
+        results[name] = elapsed
+        print(f"{name:12s} {elapsed * 1000:9.1f} ms  "
+              f"{movie_count / elapsed:10.0f} movies/s  {timestamps / elapsed:12.0f} timestamps/s")
+
+    print()
+    print(f"Speedup: {results['legacy loop'] / results['pipeline']:.1f}x (outputs identical)")
+
+if __name__ == "__main__":
+    main()
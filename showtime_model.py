@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Compact Showtime Model
+Typed records for normalized Gracenote movie showings
+
+- Showtimes are stored as integer minutes since midnight in an array
+- Theatre names and titles are interned so repeats share one string
+- '7:30 PM' labels are produced only at serialization, from a
+  precomputed 1440-entry lookup table
+"""
+
+from array import array
+from datetime import datetime
+import heapq
+import sys
+
+# '12:00 AM' ... '11:59 PM', indexed by minute of the day
+TIME_LABELS = tuple(
+    f"{(minute // 60) % 12 or 12}:{minute % 60:02d} {'AM' if minute < 720 else 'PM'}"
+    for minute in range(1440)
+)
+
+def minute_of_day(time_str):
+    """Minutes since midnight for an ISO timestamp like '2025-07-27T19:30', or None"""
+    # Fast path for the fixed-width form Gracenote sends
+    if len(time_str) == 16 and time_str[10] == 'T' and time_str[13] == ':':
+        hours = time_str[11:13]
+        minutes = time_str[14:16]
+        if hours.isdigit() and minutes.isdigit():
+            hour = int(hours)
+            minute = int(minutes)
+            if hour < 24 and minute < 60:
+                return hour * 60 + minute
+
+    if 'T' not in time_str:
+        return None
+    try:
+        dt = datetime.fromisoformat(time_str)
+    except ValueError:
+        return None
+    return dt.hour * 60 + dt.minute
+
+def earliest(minutes, k):
+    """The k earliest minutes in ascending order, without sorting the rest"""
+    if len(minutes) <= k:
+        return sorted(minutes)
+    return heapq.nsmallest(k, minutes)
+
+class Theatre:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = sys.intern(name or 'Unknown Theatre')
+
+class TheatreShowtimes:
+    """All showtimes of one movie at one theatre"""
+    __slots__ = ('theatre', 'minutes', 'labels')
+
+    def __init__(self, theatre, minutes=(), labels=()):
+        self.theatre = theatre
+        self.minutes = array('H', minutes)
+        # Entries Gracenote sent that are not timestamps, kept verbatim
+        self.labels = tuple(labels)
+
+    def to_dict(self, max_times=10):
+        times = [TIME_LABELS[minute] for minute in self.minutes[:max_times]]
+        times.extend(self.labels[:max_times - len(times)])
+        return {
+            'theatre': self.theatre.name,
+            'times': times
+        }
+
+class Movie:
+    __slots__ = ('title', 'year', 'rating', 'runtime', 'genres', 'showtimes')
+
+    def __init__(self, title, year='', rating='NR', runtime='', genres=(), showtimes=()):
+        self.title = sys.intern(title or 'Unknown')
+        self.year = year
+        self.rating = rating
+        self.runtime = runtime
+        self.genres = tuple(sys.intern(genre) for genre in genres or () if isinstance(genre, str))
+        self.showtimes = list(showtimes)
+
+    def to_dict(self, max_times=10):
+        return {
+            'title': self.title,
+            'year': self.year,
+            'rating': self.rating,
+            'runtime': self.runtime,
+            'genres': list(self.genres),
+            'showtimes': [showing.to_dict(max_times) for showing in self.showtimes]
+        }
+
+def movie_from_gracenote(raw, theatres, parsed, max_times=10):
+    """
+    Build a Movie from one /movies/showings entry
+    theatres maps theatre name -> Theatre and parsed maps timestamp ->
+    minute of day; both are shared across the whole payload so each
+    theatre and each distinct timestamp is handled once
+    """
+    minutes_by_theatre = {}
+    labels_by_theatre = {}
+
+    # Gracenote sometimes sends null for a field instead of leaving it out
+    for showing in raw.get('showtimes') or []:
+        name = (showing.get('theatre') or {}).get('name') or 'Unknown Theatre'
+        theatre = theatres.get(name)
+        if theatre is None:
+            theatre = theatres[name] = Theatre(name)
+
+        times = showing.get('dateTime', [])
+        # Ensure times is always an array
+        if isinstance(times, str):
+            times = [times]
+        elif not isinstance(times, list):
+            times = ['Check website for times']
+
+        minutes = minutes_by_theatre.get(theatre)
+        if minutes is None:
+            minutes = minutes_by_theatre[theatre] = set()
+            labels_by_theatre[theatre] = {}
+        labels = labels_by_theatre[theatre]
+
+        for time_str in times:
+            if not isinstance(time_str, str):
+                continue
+            if time_str in parsed:
+                minute = parsed[time_str]
+            else:
+                minute = parsed[time_str] = minute_of_day(time_str)
+
+            if minute is None:
+                labels[time_str] = None
+            else:
+                minutes.add(minute)
+
+    showtimes = []
+    for theatre, minutes in minutes_by_theatre.items():
+        labels = labels_by_theatre[theatre]
+        if minutes or labels:
+            kept = earliest(minutes, max_times)
+            showtimes.append(TheatreShowtimes(theatre, kept, list(labels)[:max_times - len(kept)]))
+
+    ratings = raw.get('ratings')
+    return Movie(
+        title=raw.get('title') or 'Unknown',
+        year=raw.get('releaseYear') or '',
+        rating=(ratings[0] or {}).get('code') or 'NR' if ratings else 'NR',
+        runtime=raw.get('runTime') or '',
+        genres=raw.get('genres') or (),
+        showtimes=showtimes
+    )
+
+def normalize_showings(raw_movies, max_times=10):
+    """
+    Streaming normalization stage for a /movies/showings payload
+    Yields one Movie per entry in a single pass: each distinct timestamp is
+    parsed once, times are deduplicated and ordered as integers, and only
+    the earliest max_times per theatre are kept
+    """
+    theatres = {}
+    parsed = {}
+    for raw in raw_movies:
+        yield movie_from_gracenote(raw, theatres, parsed, max_times)
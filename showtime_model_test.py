@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test of the showtime model against Gracenote entries with null fields
+No network access or API keys needed: python3 showtime_model_test.py
+"""
+
+import sys
+
+from showtime_model import Movie, Theatre, normalize_showings
+
+RAW_MOVIES = [
+    {
+        "title": None,
+        "releaseYear": None,
+        "ratings": None,
+        "runTime": None,
+        "genres": None,
+        "showtimes": [
+            {"theatre": {"name": None}, "dateTime": "2025-07-27T19:30"},
+            {"theatre": None, "dateTime": ["2025-07-27T21:00", None]}
+        ]
+    },
+    {
+        "title": "Complete Movie",
+        "releaseYear": 2025,
+        "ratings": [{"code": None}],
+        "runTime": "PT01H55M",
+        "genres": ["Drama", None],
+        "showtimes": None
+    },
+    {
+        "title": "Normal Movie",
+        "releaseYear": 2024,
+        "ratings": [{"code": "PG-13"}],
+        "genres": ["Action"],
+        "showtimes": [{"theatre": {"name": "AMC Dothan 10"}, "dateTime": "2025-07-27T18:45"}]
+    }
+]
+
+failures = []
+
+def check(label, condition):
+    print(f"   {'✅' if condition else '❌'} {label}")
+    if not condition:
+        failures.append(label)
+
+def test_null_fields():
+    print("🎬 SHOWTIME MODEL NULL FIELD TEST")
+    print("=" * 50)
+
+    try:
+        movies = [movie.to_dict() for movie in normalize_showings(RAW_MOVIES)]
+    except Exception as e:
+        check(f"payload with null fields normalizes ({e})", False)
+        sys.exit(1)
+
+    check("every entry is kept", len(movies) == 3)
+    check("null title falls back to Unknown", movies[0]['title'] == 'Unknown')
+    check("null year, rating and runtime get defaults",
+          (movies[0]['year'], movies[0]['rating'], movies[0]['runtime']) == ('', 'NR', ''))
+    check("null genres become an empty list", movies[0]['genres'] == [])
+    check("null theatre and theatre name fall back to Unknown Theatre",
+          movies[0]['showtimes'] == [{'theatre': 'Unknown Theatre', 'times': ['7:30 PM', '9:00 PM']}])
+    check("null genre entries are dropped", movies[1]['genres'] == ['Drama'])
+    check("null rating code falls back to NR", movies[1]['rating'] == 'NR')
+    check("null showtimes give no theatres", movies[1]['showtimes'] == [])
+    check("complete entries are unchanged",
+          movies[2]['showtimes'] == [{'theatre': 'AMC Dothan 10', 'times': ['6:45 PM']}])
+    check("constructors accept None",
+          Movie(None, genres=None).title == 'Unknown' and Theatre(None).name == 'Unknown Theatre')
+    print()
+
+    if failures:
+        print(f"❌ {len(failures)} checks failed")
+        sys.exit(1)
+    print("✅ All checks passed")
+
+if __name__ == "__main__":
+    test_null_fields()
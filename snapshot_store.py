@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Persistent Snapshot Store
+SQLite copy of the last normalized showings and TV schedules so a restarted
+process serves warm data immediately instead of spending upstream calls
+
+- showings: one row per movie per theatre, keyed by zip/date/radius
+- schedules: one verified schedule payload per network/date
+"""
+
+from array import array
+import json
+import os
+import sqlite3
+import time
+
+from showtime_model import Movie, Theatre, TheatreShowtimes
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS showing_snapshots (
+    zip TEXT NOT NULL,
+    date TEXT NOT NULL,
+    radius INTEGER NOT NULL,
+    source TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (zip, date, radius)
+);
+CREATE TABLE IF NOT EXISTS showings (
+    zip TEXT NOT NULL,
+    date TEXT NOT NULL,
+    radius INTEGER NOT NULL,
+    movie_order INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    year TEXT,
+    rating TEXT,
+    runtime TEXT,
+    genres TEXT,
+    theatre TEXT,
+    minutes BLOB,
+    labels TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_showings_snapshot ON showings (zip, date, radius);
+CREATE INDEX IF NOT EXISTS idx_showings_date ON showings (date);
+CREATE INDEX IF NOT EXISTS idx_showings_theatre ON showings (theatre, date);
+CREATE TABLE IF NOT EXISTS schedules (
+    network TEXT NOT NULL,
+    date TEXT NOT NULL,
+    source TEXT,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (network, date)
+);
+CREATE INDEX IF NOT EXISTS idx_schedules_date ON schedules (date);
+"""
+
+def connect(path):
+    """
+    Connection to the SQLite file at path
+    Every store opens one short-lived connection per operation, which keeps
+    them safe to share across threads
+    """
+    return sqlite3.connect(path, timeout=10)
+
+def bootstrap(path, schema):
+    """Create schema in the file at path, in WAL mode so readers do not block the writer"""
+    with connect(path) as conn:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(schema)
+
+class SnapshotStore:
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SNAPSHOT_DB', DEFAULT_DB_PATH)
+        bootstrap(self.path, SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def save_showings(self, zip_code, date_str, radius, movies, source):
+        """Replace the snapshot for (zip, date, radius) with a list of Movie records"""
+        rows = []
+        for order, movie in enumerate(movies):
+            base = (zip_code, date_str, radius, order, movie.title, str(movie.year),
+                    movie.rating, movie.runtime, json.dumps(list(movie.genres)))
+            if not movie.showtimes:
+                rows.append(base + (None, None, None))
+            for showing in movie.showtimes:
+                rows.append(base + (showing.theatre.name, showing.minutes.tobytes(),
+                                    json.dumps(list(showing.labels))))
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM showings WHERE zip = ? AND date = ? AND radius = ?',
+                         (zip_code, date_str, radius))
+            conn.executemany('INSERT INTO showings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute('INSERT OR REPLACE INTO showing_snapshots VALUES (?, ?, ?, ?, ?)',
+                         (zip_code, date_str, radius, source, time.time()))
+
+    def load_showings(self, zip_code, date_str, radius, max_age=None):
+        """
+        Rebuild the Movie list saved for (zip, date, radius)
+        Returns (movies, source, age_seconds), or None when there is no
+        snapshot or it is older than max_age
+        """
+        with self._connect() as conn:
+            snapshot = conn.execute(
+                'SELECT source, fetched_at FROM showing_snapshots WHERE zip = ? AND date = ? AND radius = ?',
+                (zip_code, date_str, radius)
+            ).fetchone()
+            if snapshot is None:
+                return None
+
+            source, fetched_at = snapshot
+            age = time.time() - fetched_at
+            if max_age is not None and age > max_age:
+                return None
+
+            rows = conn.execute(
+                'SELECT movie_order, title, year, rating, runtime, genres, theatre, minutes, labels '
+                'FROM showings WHERE zip = ? AND date = ? AND radius = ? ORDER BY movie_order, rowid',
+                (zip_code, date_str, radius)
+            ).fetchall()
+
+        movies = []
+        theatres = {}
+        current_order = None
+        for order, title, year, rating, runtime, genres, theatre, minutes, labels in rows:
+            if order != current_order:
+                current_order = order
+                movies.append(Movie(title, _restore_year(year), rating, runtime, json.loads(genres)))
+            if theatre is None:
+                continue
+
+            if theatre not in theatres:
+                theatres[theatre] = Theatre(theatre)
+            stored = array('H')
+            stored.frombytes(minutes)
+            movies[-1].showtimes.append(TheatreShowtimes(theatres[theatre], stored, json.loads(labels)))
+
+        return movies, source, age
+
+    def showings_age(self, zip_code, date_str, radius):
+        """Seconds since the showings for (zip, date, radius) were saved, or None if there are none"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT fetched_at FROM showing_snapshots WHERE zip = ? AND date = ? AND radius = ?',
+                (zip_code, date_str, radius)
+            ).fetchone()
+        return None if row is None else time.time() - row[0]
+
+    def theatre_showings(self, theatre, date_str):
+        """Titles and raw minute arrays playing at one theatre on a date"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT title, minutes FROM showings WHERE theatre = ? AND date = ? ORDER BY movie_order',
+                (theatre, date_str)
+            ).fetchall()
+
+        results = []
+        for title, minutes in rows:
+            stored = array('H')
+            stored.frombytes(minutes)
+            results.append((title, list(stored)))
+        return results
+
+    def save_schedule(self, network, date_str, payload):
+        """Store a verified schedule payload for (network, date)"""
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?, ?)',
+                         (network.lower(), date_str, payload.get('source'),
+                          json.dumps(payload), time.time()))
+
+    def load_schedule(self, network, date_str, max_age=None):
+        """Return (payload, age_seconds) for (network, date), or None if missing or too old"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT payload, fetched_at FROM schedules WHERE network = ? AND date = ?',
+                (network.lower(), date_str)
+            ).fetchone()
+        if row is None:
+            return None
+
+        payload, fetched_at = row
+        age = time.time() - fetched_at
+        if max_age is not None and age > max_age:
+            return None
+        return json.loads(payload), age
+
+    def schedule_age(self, network, date_str):
+        """Seconds since the schedule for (network, date) was saved, or None if there is none"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT fetched_at FROM schedules WHERE network = ? AND date = ?',
+                (network.lower(), date_str)
+            ).fetchone()
+        return None if row is None else time.time() - row[0]
+
+def _restore_year(year):
+    # Gracenote sends releaseYear as an int; keep that shape after the round trip
+    return int(year) if year and year.isdigit() else year
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Persistent Station Directory
+SQLite map from postal code to Gracenote lineups and stations so a network's
+station id is resolved locally instead of re-walking every lineup
+
+- lineups: the lineups Gracenote lists for a postal code, in order
+- stations: every station seen in a lineup, indexed by network, call sign and name
+- Entries are trusted for a long TTL; refresh() forgets a postal code
+"""
+
+import os
+import threading
+import time
+
+from snapshot_store import DEFAULT_DB_PATH, bootstrap, connect
+
+NETWORKS = ['nbc', 'abc', 'cbs', 'fox']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lineups (
+    postal_code TEXT NOT NULL,
+    lineup_id TEXT NOT NULL,
+    name TEXT,
+    location TEXT,
+    position INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (postal_code, lineup_id)
+);
+CREATE TABLE IF NOT EXISTS lineup_stations (
+    lineup_id TEXT NOT NULL,
+    station_id TEXT NOT NULL,
+    call_sign TEXT,
+    name TEXT,
+    network TEXT,
+    position INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (lineup_id, station_id)
+);
+CREATE INDEX IF NOT EXISTS idx_lineup_stations_network ON lineup_stations (network, lineup_id);
+CREATE INDEX IF NOT EXISTS idx_lineup_stations_call_sign ON lineup_stations (call_sign);
+CREATE INDEX IF NOT EXISTS idx_lineup_stations_name ON lineup_stations (name);
+"""
+
+def network_for_station(name):
+    """Which major network a station name belongs to, or None"""
+    name_upper = (name or '').upper()
+    for network in NETWORKS:
+        if network.upper() in name_upper:
+            return network
+    return None
+
+class StationDirectory:
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.getenv('SNAPSHOT_DB', DEFAULT_DB_PATH)
+        self.ttl = ttl if ttl is not None else int(os.getenv('STATION_DIRECTORY_TTL', 30 * 24 * 3600))
+
+        # (postal_code, network) -> (station_id, expires_at), so repeat lookups skip SQLite
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+        bootstrap(self.path, SCHEMA)
+
+    def _cutoff(self):
+        return time.time() - self.ttl
+
+    def save_lineups(self, postal_code, lineups):
+        """Replace the lineups listed for a postal code"""
+        now = time.time()
+        rows = [(postal_code, lineup.get('lineupId', ''), lineup.get('name', ''),
+                 lineup.get('location', ''), position, now)
+                for position, lineup in enumerate(lineups) if lineup.get('lineupId')]
+        with connect(self.path) as conn:
+            conn.execute('DELETE FROM lineups WHERE postal_code = ?', (postal_code,))
+            conn.executemany('INSERT INTO lineups VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def load_lineups(self, postal_code):
+        """Lineups for a postal code in Gracenote's order, or None if unknown or expired"""
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                'SELECT lineup_id, name, location FROM lineups '
+                'WHERE postal_code = ? AND fetched_at > ? ORDER BY position',
+                (postal_code, self._cutoff())
+            ).fetchall()
+        if not rows:
+            return None
+        return [{'lineupId': lineup_id, 'name': name, 'location': location}
+                for lineup_id, name, location in rows]
+
+    def save_stations(self, lineup_id, stations):
+        """Replace the stations recorded for a lineup"""
+        now = time.time()
+        rows = [(lineup_id, station.get('stationId', ''), (station.get('callSign') or '').upper(),
+                 station.get('name', ''), network_for_station(station.get('name')), position, now)
+                for position, station in enumerate(stations) if station.get('stationId')]
+        with connect(self.path) as conn:
+            conn.execute('DELETE FROM lineup_stations WHERE lineup_id = ?', (lineup_id,))
+            conn.executemany('INSERT INTO lineup_stations VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def has_stations(self, lineup_id):
+        """Whether a lineup's stations were fetched within the TTL"""
+        with connect(self.path) as conn:
+            row = conn.execute(
+                'SELECT 1 FROM lineup_stations WHERE lineup_id = ? AND fetched_at > ? LIMIT 1',
+                (lineup_id, self._cutoff())
+            ).fetchone()
+        return row is not None
+
+    def find_station(self, postal_code, network):
+        """
+        Station id for a network in a postal code, or None if no scanned lineup has it
+        The first lineup (in Gracenote's order) carrying the network wins
+        """
+        key = (postal_code, network.lower())
+        with self._lock:
+            resolved = self._resolved.get(key)
+        if resolved is not None and resolved[1] > time.time():
+            return resolved[0]
+
+        with connect(self.path) as conn:
+            row = conn.execute(
+                'SELECT s.station_id, MIN(l.fetched_at, s.fetched_at) FROM lineups l '
+                'JOIN lineup_stations s ON s.lineup_id = l.lineup_id '
+                'WHERE l.postal_code = ? AND s.network = ? AND l.fetched_at > ? AND s.fetched_at > ? '
+                'ORDER BY l.position, s.position LIMIT 1',
+                (postal_code, network.lower(), self._cutoff(), self._cutoff())
+            ).fetchone()
+        if row is None:
+            return None
+
+        station_id, fetched_at = row
+        with self._lock:
+            self._resolved[key] = (station_id, fetched_at + self.ttl)
+        return station_id
+
+    def find_by_call_sign(self, call_sign):
+        """Stations with an exact call sign, across every lineup"""
+        return self._stations('s.call_sign = ?', (call_sign.upper(),))
+
+    def find_by_name(self, name):
+        """Stations whose name contains the given text"""
+        return self._stations('s.name LIKE ?', (f"%{name}%",))
+
+    def _stations(self, where, params):
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                'SELECT DISTINCT s.station_id, s.call_sign, s.name, s.network FROM lineup_stations s '
+                f"WHERE {where} AND s.fetched_at > ? ORDER BY s.station_id",
+                params + (self._cutoff(),)
+            ).fetchall()
+        return [{'stationId': station_id, 'callSign': call_sign, 'name': name, 'network': network}
+                for station_id, call_sign, name, network in rows]
+
+    def refresh(self, postal_code):
+        """Forget everything known for a postal code so the next lookup rescans it"""
+        with connect(self.path) as conn:
+            lineup_ids = [row[0] for row in conn.execute(
+                'SELECT lineup_id FROM lineups WHERE postal_code = ?', (postal_code,))]
+            conn.executemany('DELETE FROM lineup_stations WHERE lineup_id = ?',
+                             [(lineup_id,) for lineup_id in lineup_ids])
+            conn.execute('DELETE FROM lineups WHERE postal_code = ?', (postal_code,))
+        with self._lock:
+            for key in [key for key in self._resolved if key[0] == postal_code]:
+                del self._resolved[key]
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+TVmaze Bulk Schedule Store
+Pulls TVmaze's full schedule feed (every future airing it knows about) in one
+streamed download and keeps the airings on our networks in SQLite, indexed by
+(network, date), so any covered date is answered without calling TVmaze
+
+- airings: one compact row per airing, already normalized for the schedule API
+- coverage: the date range the last sync covers, per country
+- A sync replaces the previous copy in one transaction; a failed sync keeps it
+"""
+
+from datetime import datetime, timedelta
+import os
+import time
+
+import requests
+
+from http_transport import transport
+from snapshot_store import DEFAULT_DB_PATH, bootstrap, connect
+from tvmaze_stream import iter_network_airings, tvmaze_program
+
+FULL_SCHEDULE_URL = os.getenv('TVMAZE_FULL_SCHEDULE_URL', 'https://api.tvmaze.com/schedule/full')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tvmaze_airings (
+    country TEXT NOT NULL,
+    network TEXT NOT NULL,
+    date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    time TEXT,
+    title TEXT,
+    description TEXT,
+    duration INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tvmaze_airings_day ON tvmaze_airings (country, network, date);
+CREATE TABLE IF NOT EXISTS tvmaze_coverage (
+    country TEXT PRIMARY KEY,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    airings INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+class TvmazeBulkStore:
+    def __init__(self, path=None, max_age=None):
+        self.path = path or os.getenv('SNAPSHOT_DB', DEFAULT_DB_PATH)
+        # A copy older than this no longer counts as coverage
+        self.max_age = max_age if max_age is not None else int(os.getenv('TVMAZE_BULK_MAX_AGE', 2 * 24 * 3600))
+
+        bootstrap(self.path, SCHEMA)
+
+    def replace(self, country, airings, first_date, last_date):
+        """
+        Swap in a new copy for country
+        airings is a list of (network_name, date, program) with program as built by tvmaze_program()
+        """
+        rows = [(country, network_name, date_str, position, program['time'], program['title'],
+                 program['description'], program.get('duration'))
+                for position, (network_name, date_str, program) in enumerate(airings)]
+        with connect(self.path) as conn:
+            conn.execute('DELETE FROM tvmaze_airings WHERE country = ?', (country,))
+            conn.executemany('INSERT INTO tvmaze_airings VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute('INSERT OR REPLACE INTO tvmaze_coverage VALUES (?, ?, ?, ?, ?)',
+                         (country, first_date, last_date, len(rows), time.time()))
+
+    def coverage(self, country='US'):
+        """{"first_date", "last_date", "airings", "age"} of the last sync, or None if missing or too old"""
+        with connect(self.path) as conn:
+            row = conn.execute(
+                'SELECT first_date, last_date, airings, synced_at FROM tvmaze_coverage WHERE country = ?',
+                (country,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        first_date, last_date, airings, synced_at = row
+        age = time.time() - synced_at
+        if age > self.max_age:
+            return None
+        return {"first_date": first_date, "last_date": last_date, "airings": airings, "age": int(age)}
+
+    def get_day(self, date_str, network_names, country='US'):
+        """
+        Programs per network name for a date, in the same shape as a TVmaze day index,
+        or None if the date is outside the last sync's coverage
+        """
+        coverage = self.coverage(country)
+        if coverage is None or not coverage['first_date'] <= date_str <= coverage['last_date']:
+            return None
+
+        network_names = list(network_names)
+        placeholders = ', '.join('?' * len(network_names))
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                'SELECT network, time, title, description, duration FROM tvmaze_airings '
+                f"WHERE country = ? AND network IN ({placeholders}) AND date = ? ORDER BY time, position",
+                [country] + network_names + [date_str]
+            ).fetchall()
+
+        index = {}
+        for network_name, time_str, title, description, duration in rows:
+            index.setdefault(network_name, []).append({
+                "time": time_str,
+                "title": title,
+                "description": description,
+                "duration": duration
+            })
+        return index
+
+def sync_full_schedule(session, store, network_names, country='US', url=None, timeout=60):
+    """
+    Stream TVmaze's full schedule and replace the stored copy for country
+    Only airings on network_names from tomorrow on are kept. Returns a summary,
+    or {"error": ...} with the previous copy left in place.
+    """
+    url = url or FULL_SCHEDULE_URL
+    # The feed lists upcoming episodes, so today's already-aired programs may be
+    # missing; today is left to the day schedule
+    first_date = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    airings = []
+    last_date = first_date
+
+    start = time.monotonic()
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+
+            for network_name, airing, show in iter_network_airings(response, network_names):
+                network_country = ((show.get('network') or {}).get('country') or {}).get('code')
+                airdate = airing.get('airdate') or ''
+                if (network_country and network_country != country) or airdate < first_date:
+                    continue
+                airings.append((network_name, airdate, tvmaze_program(airing, show)))
+                last_date = max(last_date, airdate)
+    except (requests.RequestException, ValueError) as e:
+        print(f"TVmaze bulk sync failed: {e}")
+        return {"error": f"TVmaze bulk sync failed: {str(e)}"}
+
+    if not airings:
+        # An empty feed would blank out every covered date
+        return {"error": "TVmaze full schedule had no airings on the supported networks"}
+
+    store.replace(country, airings, first_date, last_date)
+    print(f"TVmaze bulk sync: {len(airings)} {country} airings from {first_date} to {last_date} "
+          f"in {time.monotonic() - start:.1f}s")
+    return {"country": country, "first_date": first_date, "last_date": last_date, "airings": len(airings)}
+
+def main():
+    """Standalone mode: sync the local copy once"""
+    from comprehensive_api import TVMAZE_NETWORKS
+
+    session = transport.client({
+        'User-Agent': 'Mozilla/5.0 (compatible; TVScheduleViewer/1.0)',
+        'Accept': 'application/json'
+    })
+    result = sync_full_schedule(session, TvmazeBulkStore(), TVMAZE_NETWORKS.values())
+    if result.get('error'):
+        print(f"❌ {result['error']}")
+    else:
+        print(f"✅ {result['airings']} airings cached, {result['first_date']} to {result['last_date']}")
+
+if __name__ == "__main__":
+    main()
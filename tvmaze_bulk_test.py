@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test of the TVmaze bulk schedule store against a local stand-in server
+No network access or API keys needed: python3 tvmaze_bulk_test.py
+"""
+
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Keep the test's SQLite data out of the real snapshot file
+os.environ['SNAPSHOT_DB'] = os.path.join(tempfile.mkdtemp(), 'tvmaze_bulk_test.db')
+
+from comprehensive_api import ComprehensiveTVAPI, TVMAZE_NETWORKS
+from http_transport import transport
+from snapshot_store import SnapshotStore
+from tvmaze_bulk import TvmazeBulkStore, sync_full_schedule
+
+def day(offset):
+    return (datetime.now() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+def episode(show, network, country, airdate, airtime, runtime=60):
+    return {
+        "airdate": airdate,
+        "airtime": airtime,
+        "runtime": runtime,
+        "_embedded": {"show": {
+            "name": show,
+            "summary": f"<p>{show} summary</p>",
+            "network": {"name": network, "country": {"code": country}}
+        }}
+    }
+
+FULL_SCHEDULE = [
+    episode("Evening News", "NBC", "US", day(1), "18:30", 30),
+    episode("Prime Drama", "NBC", "US", day(1), "20:00"),
+    episode("Game Night", "ABC", "US", day(1), "20:00"),
+    episode("Late Comedy", "CBS", "US", day(2), "23:35", 35),
+    episode("Animation Block", "FOX", "US", day(3), "19:00", 30),
+    episode("Yesterday's Show", "NBC", "US", day(-1), "20:00"),
+    episode("Tonight's Show", "NBC", "US", day(0), "22:00"),
+    episode("Foreign Fox", "FOX", "BR", day(1), "21:00"),
+    episode("Cable Show", "HBO", "US", day(1), "21:00")
+]
+
+class StandInTVmaze(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        StandInTVmaze.requests_seen.append(self.path)
+        body = json.dumps(FULL_SCHEDULE).encode()
+
+        if self.path == '/schedule/full':
+            self.send_response(200)
+        elif self.path == '/truncated':
+            self.send_response(200)
+            body = body[:len(body) // 2]
+        elif self.path == '/empty':
+            self.send_response(200)
+            body = b'[]'
+        else:
+            self.send_response(404)
+            body = b'{}'
+
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+failures = []
+
+def check(label, condition):
+    print(f"   {'✅' if condition else '❌'} {label}")
+    if not condition:
+        failures.append(label)
+
+def test_tvmaze_bulk():
+    print("📦 TVMAZE BULK SCHEDULE TEST")
+    print("=" * 50)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInTVmaze)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    print(f"Stand-in TVmaze running at {base_url}")
+    print()
+
+    api = ComprehensiveTVAPI(hedged=False, store=SnapshotStore(os.path.join(tempfile.mkdtemp(), 'injected.db')))
+    store = api.tvmaze_bulk
+    check("bulk store lives in the injected snapshot file", store.path == api.store.path)
+    networks = TVMAZE_NETWORKS.values()
+
+    print("1. Sync from the full schedule feed")
+    result = sync_full_schedule(api.session, store, networks, url=f"{base_url}/schedule/full")
+    check("sync succeeds", not result.get('error'))
+    check("keeps only US airings on supported networks from tomorrow on", result.get('airings') == 5)
+    coverage = store.coverage()
+    check("coverage runs from tomorrow to the last airing",
+          coverage is not None and (coverage['first_date'], coverage['last_date']) == (day(1), day(3)))
+    print()
+
+    print("2. Covered dates are answered from disk")
+    index = store.get_day(day(1), networks)
+    check("NBC airings are in time order",
+          [program['title'] for program in index.get('NBC', [])] == ["Evening News", "Prime Drama"])
+    check("entries are normalized like the day schedule",
+          index['NBC'][0] == {"time": "18:30", "title": "Evening News",
+                              "description": "Evening News summary", "duration": 30})
+    check("foreign and cable networks are dropped",
+          'HBO' not in index and [program['title'] for program in index.get('FOX', [])] == [])
+    check("dates before the sync are not covered", store.get_day(day(-1), networks) is None)
+    check("today is left to the day schedule", store.get_day(day(0), networks) is None)
+    check("dates after the last airing are not covered", store.get_day(day(4), networks) is None)
+    print()
+
+    print("3. get_tvmaze_schedule() uses the local copy")
+    upstream_before = transport.stats().get('api.tvmaze.com', {}).get('requests', 0)
+    schedule = api.get_tvmaze_schedule('cbs', day(2))
+    upstream_after = transport.stats().get('api.tvmaze.com', {}).get('requests', 0)
+    check("CBS schedule comes back verified",
+          schedule.get('status') == 'verified' and schedule['schedule'][0]['title'] == "Late Comedy")
+    check("no request reached api.tvmaze.com", upstream_after == upstream_before)
+    print()
+
+    print("4. Failed syncs keep the previous copy")
+    check("truncated feed is rejected",
+          sync_full_schedule(api.session, store, networks, url=f"{base_url}/truncated").get('error') is not None)
+    check("empty feed is rejected",
+          sync_full_schedule(api.session, store, networks, url=f"{base_url}/empty").get('error') is not None)
+    check("missing feed is rejected",
+          sync_full_schedule(api.session, store, networks, url=f"{base_url}/missing").get('error') is not None)
+    check("previous airings are still served", len(store.get_day(day(1), networks).get('NBC', [])) == 2)
+    print()
+
+    print("5. Old copies stop counting as coverage")
+    expired = TvmazeBulkStore(store.path, max_age=0)
+    check("coverage expires after TVMAZE_BULK_MAX_AGE", expired.get_day(day(1), networks) is None)
+    print()
+
+    server.shutdown()
+    print(f"Stand-in served {len(StandInTVmaze.requests_seen)} requests")
+    if failures:
+        print(f"❌ {len(failures)} checks failed")
+        sys.exit(1)
+    print("✅ All checks passed")
+
+if __name__ == "__main__":
+    test_tvmaze_bulk()
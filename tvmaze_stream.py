@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Streaming TVmaze Schedule Parser
+Walks a TVmaze /schedule or /schedule/full response (one big JSON array of airings) as it
+downloads and keeps only the airings on the networks we want, so memory
+stays flat no matter how large the day's payload is and filtering
+overlaps with the download
+
+- Each array element is decoded on its own as soon as its last byte arrives
+- Airings on other networks are dropped straight away
+"""
+
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+# Whitespace and commas between array elements
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def iter_text(response, chunk_size=CHUNK_SIZE):
+    """Decoded text chunks of a streamed requests response (gzip is undone by requests)"""
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def iter_json_array(chunks):
+    """
+    Yield each element of a top-level JSON array read from text chunks
+    Elements are decoded as soon as they are complete; only the unfinished
+    one is kept in memory between chunks
+    """
+    buf = ''
+    pos = 0
+    opened = False
+
+    for chunk in chunks:
+        buf += chunk
+
+        if not opened:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                continue
+            if buf[pos] != '[':
+                raise ValueError("TVmaze response is not a JSON array")
+            opened = True
+            pos += 1
+
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf) or buf[pos] == ']':
+                break
+            try:
+                element, end = _decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Element continues in the next chunk
+                break
+            pos = end
+            yield element
+
+        buf = buf[pos:]
+        pos = 0
+
+    if buf.strip() not in (']', ''):
+        raise ValueError("TVmaze response ended in the middle of an element")
+
+def iter_network_airings(response, network_names):
+    """
+    Yield (network_name, airing, show) for every airing on one of network_names
+    airing and show are the decoded TVmaze objects; the show is nested under
+    "show" in day schedules and under "_embedded" in the full schedule
+    """
+    wanted = set(network_names)
+    for airing in iter_json_array(iter_text(response)):
+        show = airing.get('show') or (airing.get('_embedded') or {}).get('show') or {}
+        network = show.get('network') or {}
+        name = network.get('name')
+        if name in wanted:
+            yield name, airing, show
+
+def tvmaze_program(airing, show):
+    """Schedule entry for one TVmaze airing"""
+    summary = show.get('summary') or 'No description available'
+    # Clean HTML from summary
+    summary = summary.replace('<p>', '').replace('</p>', '').replace('<b>', '').replace('</b>', '')
+    
+    return {
+        "time": airing.get('airtime', ''),
+        "title": show.get('name', 'Unknown Show'),
+        "description": summary[:200] + "..." if len(summary) > 200 else summary,
+        "duration": airing.get('runtime') or show.get('runtime')
+    }
@@ -4,6 +4,7 @@ Test Video + Sports API endpoints that should work with your plan
 """
 
 import requests
+from gracenote_quota import gracenote_budget, QuotaExhausted, PRIORITY_DIAGNOSTIC
 
 def test_video_sports_apis():
     api_key = 'uk2dqjggp2qr9vzgce4a8dq7'
@@ -55,6 +56,12 @@ def test_video_sports_apis():
         test_params = {'api_key': api_key}
         test_params.update(params)
         
+        try:
+            gracenote_budget.acquire(PRIORITY_DIAGNOSTIC)
+        except QuotaExhausted as e:
+            print(f"  ⏸️ {e} - stopping diagnostics")
+            break
+        
         try:
             response = requests.get(url, params=test_params, timeout=10)
             call_count += 1
@@ -88,7 +95,7 @@ def test_video_sports_apis():
         
         print()
     
-    print(f"🔄 API Calls Used: {call_count}/50 today")
+    print(f"🔄 API Calls Used: {call_count} this run, {gracenote_budget.stats()['calls_used']}/50 today")
     print()
     
     print("✅ WORKING ENDPOINTS:")
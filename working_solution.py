@@ -4,14 +4,15 @@ WORKING TV Schedule Solution
 Uses reliable APIs that work immediately without approval delays
 """
 
-import requests
 from datetime import datetime, timedelta
 import json
+import re
+from http_transport import transport
+from tvmaze_stream import iter_network_airings
 
 class WorkingTVAPI:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = transport.client({
             'User-Agent': 'TVScheduleViewer/1.0'
         })
     
@@ -29,11 +30,6 @@ class WorkingTVAPI:
                 'date': date_str
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            all_shows = response.json()
-            
             # Filter for the specific network
             network_map = {
                 'nbc': 'NBC',
@@ -47,26 +43,25 @@ class WorkingTVAPI:
                 return {"error": f"Network {network} not supported"}
             
             network_shows = []
-            for show in all_shows:
-                show_network = show.get('show', {}).get('network')
-                if show_network and show_network.get('name') == target_network:
-                    
-                    airtime = show.get('airtime', 'TBA')
-                    title = show.get('show', {}).get('name', 'Unknown Show')
-                    summary = show.get('show', {}).get('summary', 'No description available')
+            # Stream the response and only decode airings on the target network
+            with self.session.get(url, params=params, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                
+                for _, airing, show in iter_network_airings(response, [target_network]):
+                    airtime = airing.get('airtime', 'TBA')
+                    title = show.get('name', 'Unknown Show')
+                    summary = show.get('summary') or 'No description available'
                     
                     # Clean HTML tags
-                    if summary:
-                        import re
-                        summary = re.sub('<[^<]+?>', '', summary)
+                    summary = re.sub('<[^<]+?>', '', summary)
                     
                     network_shows.append({
                         "time": airtime,
                         "title": title,
                         "description": summary[:200] + "..." if len(summary) > 200 else summary,
-                        "runtime": show.get('runtime', ''),
-                        "season": show.get('season', ''),
-                        "episode": show.get('number', '')
+                        "runtime": airing.get('runtime', ''),
+                        "season": airing.get('season', ''),
+                        "episode": airing.get('number', '')
                     })
             
             # Sort by time